@@ -1,18 +1,29 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response
 import pymongo
 import json
 import os
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import json_util
 import pandas as pd
 import matplotlib.pyplot as plt
 import io
 import base64
 from matplotlib.figure import Figure
+from matplotlib.patches import Patch
 import seaborn as sns
 import random
-from scipy.stats import norm
+import itertools
+import threading
+import time
+import uuid
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from scipy import optimize, integrate, sparse
+from scipy.special import expit
+from scipy.stats import norm, qmc
 
 app = Flask(__name__)
 
@@ -24,9 +35,240 @@ analysis_collection = db["analysis"]
 market_collection = db["market_data"]
 consumer_collection = db["consumer_data"]
 economic_collection = db["economic_data"]
+simulation_jobs_collection = db["simulation_jobs"]
+simulation_job_results_collection = db["simulation_job_results"]
+simulation_cache_collection = db["simulation_cache"]
+sensitivity_collection = db["sensitivity"]
+qre_collection = db["quantal_response"]
+
+# Indexes each collection should have, with the hot-path queries they serve.
+# A query is a filter, or a (filter, sort) pair for sorted reads.
+INDEX_SPECS = {
+    "products": [
+        {"name": "year_company", "keys": [("year", 1), ("company", 1)], "unique": True,
+         "queries": [{"year": 0}, {"year": 0, "company": ""},
+                     ({"year": {"$in": [0]}}, [("_id", 1)]),
+                     ({"year": {"$gte": 0, "$lte": 0}}, [("year", 1), ("_id", 1)])]}
+    ],
+    "analysis": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}]}
+    ],
+    "market_data": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}, {"year": {"$in": [0]}}]}
+    ],
+    "consumer_data": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}, {"year": {"$in": [0]}}]}
+    ],
+    "economic_data": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}, {"year": {"$in": [0]}}]}
+    ],
+    # Simulation jobs and their result batches expire through TTL indexes
+    "simulation_jobs": [
+        {"name": "expires_at", "keys": [("expires_at", 1)], "expire_after_seconds": 0, "queries": []}
+    ],
+    "simulation_job_results": [
+        {"name": "job_batch", "keys": [("job_id", 1), ("batch", 1)], "unique": True, "queries": [{"job_id": ""}]},
+        # Event streams read the batches stored since their last poll
+        {"name": "job_seq", "keys": [("job_id", 1), ("seq", 1)], "unique": True, "queries": [{"job_id": "", "seq": {"$gte": 0}}]},
+        {"name": "expires_at", "keys": [("expires_at", 1)], "expire_after_seconds": 0, "queries": []}
+    ],
+    # Cached simulations are read by key among the unexpired entries
+    "simulation_cache": [
+        {"name": "_id_", "keys": [("_id", 1)], "queries": [{"_id": {"$in": [""]}, "expires_at": {"$gt": datetime.min}}]},
+        {"name": "expires_at", "keys": [("expires_at", 1)], "expire_after_seconds": 0, "queries": []}
+    ],
+    "sensitivity": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}]}
+    ],
+    "quantal_response": [
+        {"name": "year", "keys": [("year", 1)], "unique": True, "queries": [{"year": 0}, {"year": {"$in": [0]}}]}
+    ]
+}
+
+# Create any declared index that does not exist yet
+def ensure_indexes():
+    report = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        created = []
+        failed = []
+        for spec in specs:
+            # MongoDB creates the _id index with the collection
+            if spec["name"] in existing or spec["name"] == "_id_":
+                continue
+            try:
+                options = {"expireAfterSeconds": spec["expire_after_seconds"]} if "expire_after_seconds" in spec else {}
+                collection.create_index(spec["keys"], name=spec["name"], unique=spec.get("unique", False), **options)
+                created.append(spec["name"])
+            except pymongo.errors.PyMongoError as e:
+                # E.g. duplicate (year, company) documents block a unique index
+                failed.append({"index": spec["name"], "error": str(e)})
+        report[collection_name] = {"created": created, "failed": failed}
+    return report
+
+# Stage names and index names used anywhere in an explain() plan tree
+def plan_stages(plan):
+    stages = []
+    index_names = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "indexName" in plan:
+            index_names.append(plan["indexName"])
+        for key in ("queryPlan", "inputStage", "inputStages"):
+            children = plan.get(key, [])
+            for child in children if isinstance(children, list) else [children]:
+                child_stages, child_indexes = plan_stages(child)
+                stages += child_stages
+                index_names += child_indexes
+    return stages, index_names
+
+# Check every declared index exists and is picked by the queries it is meant
+# to serve, and list indexes nobody declared
+def verify_indexes():
+    report = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        declared = {spec["name"] for spec in specs}
+        unused = []
+        
+        for spec in specs:
+            for query in spec["queries"]:
+                query_filter, sort = query if isinstance(query, tuple) else (query, None)
+                try:
+                    cursor = collection.find(query_filter)
+                    if sort:
+                        cursor = cursor.sort(sort)
+                    plan = cursor.explain()["queryPlanner"]["winningPlan"]
+                except Exception as e:
+                    unused.append({"index": spec["name"], "query": query, "error": str(e)})
+                    continue
+                stages, index_names = plan_stages(plan)
+                if spec["name"] not in index_names:
+                    unused.append({"index": spec["name"], "query": query, "stages": stages})
+        
+        report[collection_name] = {
+            "missing": [spec["name"] for spec in specs if spec["name"] not in existing],
+            "unused": unused,
+            "undeclared": sorted(name for name in existing if name != "_id_" and name not in declared)
+        }
+    return report
+
+def manage_indexes():
+    created = ensure_indexes()
+    report = verify_indexes()
+    for collection_name, collection_report in report.items():
+        collection_report.update(created[collection_name])
+        if collection_report["missing"] or collection_report["unused"] or collection_report["failed"]:
+            app.logger.warning("Index check for %s: %s", collection_name, collection_report)
+    return report
+
+# In-process cache of serialized analysis documents keyed by (year, version).
+# The version of a year is bumped whenever its analysis is upserted, so stale
+# entries are never served and age out of the LRU.
+ANALYSIS_CACHE_SIZE = 64
+analysis_cache = OrderedDict()
+analysis_versions = {}
+analysis_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+analysis_cache_lock = threading.Lock()
+
+def invalidate_analysis_cache(years):
+    with analysis_cache_lock:
+        for year in years:
+            analysis_versions[year] = analysis_versions.get(year, 0) + 1
+            for key in [key for key in analysis_cache if key[0] == year]:
+                del analysis_cache[key]
+            analysis_cache_stats["invalidations"] += 1
+
+# Serialized analysis document for a year, or None if there is none
+def load_serialized_analysis(year):
+    with analysis_cache_lock:
+        key = (year, analysis_versions.get(year, 0))
+        payload = analysis_cache.get(key)
+        if payload is not None:
+            analysis_cache.move_to_end(key)
+            analysis_cache_stats["hits"] += 1
+            return payload
+        analysis_cache_stats["misses"] += 1
+    
+    analysis = analysis_collection.find_one({"year": year})
+    if not analysis:
+        return None
+    payload = json_util.dumps(analysis).encode("utf-8")
+    
+    with analysis_cache_lock:
+        analysis_cache[key] = payload
+        analysis_cache.move_to_end(key)
+        while len(analysis_cache) > ANALYSIS_CACHE_SIZE:
+            analysis_cache.popitem(last=False)
+            analysis_cache_stats["evictions"] += 1
+    
+    return payload
+
+# Simulation results keyed by a hash of the year, the base data, the payoff
+# model and the normalized scenario, so any change to the inputs misses. The
+# in-process LRU expires entries after a TTL; MongoDB can hold a second tier
+# shared between processes.
+SIMULATION_CACHE_SIZE = 4096
+SIMULATION_CACHE_TTL = 3600
+SIMULATION_CACHE_MONGO = os.environ.get("SIMULATION_CACHE_MONGO", "0") == "1"
+simulation_cache = OrderedDict()
+simulation_cache_stats = {"hits": 0, "mongo_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+simulation_cache_lock = threading.Lock()
+
+# Cached results for the given keys; keys without a live entry are left out
+def load_cached_simulations(keys):
+    found = {}
+    now = time.monotonic()
+    with simulation_cache_lock:
+        for key in keys:
+            entry = simulation_cache.get(key)
+            if entry is None:
+                continue
+            if entry[0] < now:
+                del simulation_cache[key]
+                simulation_cache_stats["expirations"] += 1
+                continue
+            simulation_cache.move_to_end(key)
+            found[key] = entry[1]
+        simulation_cache_stats["hits"] += len(found)
+    
+    missing = [key for key in keys if key not in found]
+    if SIMULATION_CACHE_MONGO and missing:
+        stored = {doc["_id"]: doc["result"] for doc in simulation_cache_collection.find(
+            {"_id": {"$in": missing}, "expires_at": {"$gt": datetime.utcnow()}}, {"result": 1})}
+        store_cached_simulations(stored, persist=False)
+        found.update(stored)
+        with simulation_cache_lock:
+            simulation_cache_stats["mongo_hits"] += len(stored)
+    
+    with simulation_cache_lock:
+        simulation_cache_stats["misses"] += len(keys) - len(found)
+    return found
+
+def store_cached_simulations(results, persist=True):
+    expires = time.monotonic() + SIMULATION_CACHE_TTL
+    with simulation_cache_lock:
+        for key, result in results.items():
+            simulation_cache[key] = (expires, result)
+            simulation_cache.move_to_end(key)
+        while len(simulation_cache) > SIMULATION_CACHE_SIZE:
+            simulation_cache.popitem(last=False)
+            simulation_cache_stats["evictions"] += 1
+    
+    if SIMULATION_CACHE_MONGO and persist and results:
+        expires_at = datetime.utcnow() + timedelta(seconds=SIMULATION_CACHE_TTL)
+        simulation_cache_collection.bulk_write([
+            pymongo.UpdateOne({"_id": key}, {"$set": {"result": result, "expires_at": expires_at}}, upsert=True)
+            for key, result in results.items()
+        ], ordered=False)
 
 # Initialize database with realistic data
 def init_db():
+    manage_indexes()
+    
     if products_collection.count_documents({}) == 0:
         # Load data from CSV files if they exist, otherwise use default data
         try:
@@ -102,11 +344,6 @@ def init_db():
             
             products_collection.insert_many(products_data)
     
-    # Always run initial analysis for each year to ensure data is available
-    for year in range(2018, 2026):
-        if not analysis_collection.find_one({"year": year}):
-            run_game_theory_analysis(year)
-    
     # Initialize market data if empty
     if market_collection.count_documents({}) == 0:
         try:
@@ -213,243 +450,1223 @@ def init_db():
             
             economic_collection.insert_many(economic_data)
     
-    # Run initial analysis for each year
-    for year in range(2018, 2026):
-        run_game_theory_analysis(year)
+    # Run initial analysis for every year in one batch
+    run_batch_analysis()
 
-# Game theory analysis using numpy for payoff calculations
-def run_game_theory_analysis(year):
-    # Get data for the specified year
-    milk_bikis_data = products_collection.find_one({"company": "Milk Bikis", "year": year})
-    good_day_data = products_collection.find_one({"company": "Good Day", "year": year})
-    parle_g_data = products_collection.find_one({"company": "Parle G", "year": year})
-    market_data = market_collection.find_one({"year": year})
-    consumer_data = consumer_collection.find_one({"year": year})
-    economic_data = economic_collection.find_one({"year": year})
+# Payoff model coefficients used by the game theory analysis
+STRATEGIES = ["maintain", "shrink"]
+PAYOFF_MODEL = {
+    "shrink_size_factor": 0.95,       # Shrink by 5%
+    "shrink_cost_factor": 0.97,       # Production cost decreases by 3%
+    "solo_shrink_penalty": 2.0,       # Only company to shrink
+    "lone_maintain_bonus": 1.5,       # Only company to maintain
+    "all_shrink_penalty": 0.5,        # Everyone shrinks
+    "partial_shrink_penalty": 1.0,    # Shrink while some competitors maintain
+    "share_adjustment": True,         # Apply the market share change to profits
+    "economic_adjustment": True,      # Scale share changes by consumer confidence
+    "confidence_baseline": 70.0,      # Consumer confidence normalisation
+    "price_share_elasticity": 0.5,    # Share points lost per 1% priced above rivals
+    "market_size": 1000000,           # Assumed market size in units
+    "payoff_scale": 1000000,          # Profit units per payoff point
+    "payoff_cap": 10.0
+}
+
+# The simulation uses stronger consumer reactions but keeps market shares fixed
+SIMULATION_PAYOFF_MODEL = dict(
+    PAYOFF_MODEL,
+    solo_shrink_penalty=3.0,
+    lone_maintain_bonus=2.5,
+    all_shrink_penalty=0.3,
+    partial_shrink_penalty=1.5,
+    share_adjustment=False,
+    economic_adjustment=False
+)
+
+# Above this many players the nested full_payoffs dict is too large to store
+MAX_FULL_PAYOFF_PLAYERS = 8
+
+# Multi-level strategy grids: every combination of a shrink level and a price
+# change. The maintain/shrink game is the grid shrink 0% or 5%, price +0%.
+DEFAULT_STRATEGY_GRID = {
+    "shrink_levels": [0, 2.5, 5, 7.5, 10, 12.5, 15, 17.5, 20],   # % of product size
+    "price_changes": [-5, 0, 5, 10]                              # % of current price
+}
+GRID_CHUNK_SIZE = 1 << 15             # Profiles evaluated per vectorized step
+GRID_SEARCH_TIME_BUDGET = 2.0         # Seconds per grid equilibrium search
+GRID_MAX_PROFILES = 1 << 40           # Reduced profile spaces beyond this are rejected
+MAX_GRID_EQUILIBRIA = 100
+# Sequential-move games are solved over rival aggregates; the reachable
+# aggregate states per move are capped
+STACKELBERG_MAX_STATES = 1 << 22
+
+# Scenario grids are solved in batches of this many scenarios
+SCENARIO_BATCH_SIZE = 1024
+SCENARIO_GRID_MAX_POINTS = 1000000
+
+# Phase diagram parameters with their default (min, max) sweep
+PHASE_DIAGRAM_PARAMETERS = {
+    "shrinkflation_awareness": (0.0, 100.0),
+    "consumer_confidence_index": (0.0, 150.0),
+    "production_cost_change": (-30.0, 30.0),
+    "price_change": (-30.0, 30.0)
+}
+PHASE_DIAGRAM_DEFAULT_STEPS = 101
+PHASE_DIAGRAM_MAX_STEPS = 1000
+# Payoff table and profile mask entries evaluated per chunk of cells
+PHASE_DIAGRAM_CHUNK_SIZE = 1 << 20
+
+# Monte Carlo standard deviations around each year's values: awareness (0-100),
+# confidence and brand loyalty (0-10) are absolute, per-company production
+# cost, market share and price are relative
+MONTE_CARLO_DISTRIBUTIONS = {
+    "shrinkflation_awareness": 10.0,
+    "consumer_confidence_index": 8.0,
+    "brand_loyalty": 0.5,
+    "production_cost": 0.1,
+    "market_share": 0.1,
+    "price": 0.0
+}
+MONTE_CARLO_DEFAULT_SAMPLES = 10000
+MONTE_CARLO_MAX_SAMPLES = 1000000
+# Draws per chunk; every chunk has its own seeded stream, so results only
+# depend on the seed and the sample count
+MONTE_CARLO_CHUNK_SIZE = 1 << 14
+MONTE_CARLO_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+# Asynchronous simulation jobs. Batches run on a process pool that leaves one
+# core to the web process; each job keeps at most one batch per worker in
+# flight and only a few jobs may be active at once.
+SIMULATION_JOB_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+SIMULATION_JOB_MAX_ACTIVE = 4
+# Seconds finished jobs and their results are kept
+SIMULATION_JOB_TTL = 24 * 3600
+# Seconds between progress events on a job's event stream
+SIMULATION_JOB_EVENT_INTERVAL = 0.5
+
+# Sensitivity analysis factor ranges around each year's values: awareness
+# (0-100), confidence and brand loyalty (0-10) are absolute, production cost
+# and market share are relative
+SENSITIVITY_RANGES = {
+    "shrinkflation_awareness": 20.0,
+    "consumer_confidence_index": 20.0,
+    "brand_loyalty": 2.0,
+    "production_cost": 0.2,
+    "market_share": 0.2
+}
+SENSITIVITY_MORRIS_TRAJECTORIES = 100
+SENSITIVITY_MORRIS_LEVELS = 4
+# Base sample count of the Saltelli design, a power of two
+SENSITIVITY_SOBOL_SAMPLES = 1024
+SENSITIVITY_SEED = 0
+# Samples evaluated per stacked batch of payoff tables
+SENSITIVITY_CHUNK_SIZE = 1 << 13
+
+# Multi-period simulation: how the state a period's strategies leave behind
+# drifts and fluctuates on its way into the next period
+ROLLING_SIMULATION_DYNAMICS = {
+    "cost_drift": 0.03,             # production cost inflation per period
+    "cost_volatility": 0.03,        # relative sd of production cost shocks
+    "share_volatility": 0.02,       # relative sd of market share shocks
+    "awareness_gain": 15.0,         # awareness points gained when every company shrinks
+    "awareness_decay": 0.1,         # share of awareness forgotten per period
+    "awareness_volatility": 3.0,    # sd of awareness shocks, in points
+    "confidence_volatility": 3.0    # sd of consumer confidence shocks
+}
+ROLLING_DEFAULT_PERIODS = 10
+ROLLING_MAX_PERIODS = 50
+ROLLING_DEFAULT_PATHS = 1000
+ROLLING_MAX_PATHS = 20000
+ROLLING_PERCENTILES = [5, 50, 95]
+
+# Agent-based consumer market: utility weights of the brand choice rule and
+# the spread of consumer traits around the year's consumer data
+AGENT_MARKET_MODEL = {
+    "loyalty_weight": 3.0,          # utility of full loyalty to a brand
+    "inertia": 1.0,                 # utility of staying with the current brand
+    "price_weight": 2.0,            # utility lost per log unit price above the market mean
+    "shrink_aversion": 1.5,         # utility aware consumers take off a shrinking brand
+    "loyalty_dispersion": 0.15,     # sd of loyalty around the brand's score (0-1)
+    "sensitivity_dispersion": 0.5   # sigma of lognormal price sensitivity
+}
+AGENT_DEFAULT_COUNT = 1000000
+AGENT_MAX_COUNT = 5000000
+AGENT_DEFAULT_PERIODS = 5
+AGENT_MAX_PERIODS = 50
+# Agents per chunk when computing choice probabilities
+AGENT_CHUNK_SIZE = 1 << 18
+# Agents sampled and iterations used to calibrate the brand constants
+AGENT_CALIBRATION_SAMPLE = 1 << 16
+AGENT_CALIBRATION_ITERATIONS = 100
+
+# Evolutionary dynamics: each company stands for a population of firms whose
+# shrinking share follows replicator or logit dynamics
+EVOLUTIONARY_DYNAMICS = ["replicator", "logit"]
+EVOLUTIONARY_DEFAULT_SAMPLES = 1000
+EVOLUTIONARY_MAX_SAMPLES = 100000
+EVOLUTIONARY_DEFAULT_HORIZON = 50.0
+EVOLUTIONARY_MAX_HORIZON = 1000.0
+EVOLUTIONARY_TIME_POINTS = 101
+EVOLUTIONARY_DEFAULT_RATIONALITY = 10.0  # logit choice intensity per unit of normalized payoff gain
+EVOLUTIONARY_DEFAULT_TRAJECTORIES = 25
+EVOLUTIONARY_MAX_TRAJECTORIES = 500
+EVOLUTIONARY_CONVERGENCE = 1e-4          # Largest speed of a settled state
+EVOLUTIONARY_PURE_TOLERANCE = 0.02      # Final shares this close to 0 or 1 count as pure
+EVOLUTIONARY_NASH_TOLERANCE = 0.02      # Attractors with regret up to this share of the largest shrink gain count as Nash
+EVOLUTIONARY_BASIN_RESOLUTION = 0.05     # Bin width of mixed final shares when grouping attractors
+
+# Mixed strategy equilibrium search limits
+MIXED_NASH_TIME_BUDGET = 0.5          # Seconds per solver call
+SUPPORT_ENUMERATION_MAX_PLAYERS = 4   # Larger games follow the logit homotopy path
+MIXED_NASH_TOLERANCE = 1e-6           # Maximum regret of an equilibrium, in payoff points
+
+# Correlated equilibria are solved as linear programs over all 2^N profiles
+CORRELATED_EQUILIBRIUM_MAX_PLAYERS = 12
+CORRELATED_EQUILIBRIUM_MIN_PROBABILITY = 1e-6   # Smaller profile probabilities are not reported
+
+# Logit quantal response equilibrium path, traced from lambda = 0 up to
+# QRE_LAMBDA_MAX by pseudo-arclength continuation in (shrink probabilities, nu)
+# with lambda = nu / (1 - nu)
+QRE_LAMBDA_MAX = 1e4
+QRE_REPORT_LAMBDAS = [0.1, 1, 10, 100, 1000]
+QRE_MAX_STEPS = 2000
+QRE_INITIAL_STEP = 0.05
+QRE_MAX_STEP = 0.05
+QRE_MIN_STEP = 1e-9
+QRE_NEWTON_STEPS = 6
+QRE_TOLERANCE = 1e-8                 # Largest residual of an accepted path point
+
+# Bayesian game: nobody observes the true shrinkflation awareness and each
+# firm only knows its own production cost. A firm's type is its cost level
+# and its private signal of the awareness level; both come from normal
+# distributions discretized by Gauss-Hermite quadrature.
+BAYESIAN_GAME = {
+    "awareness_levels": 3,
+    "awareness_sd": 10.0,       # points of shrinkflation_awareness
+    "cost_levels": 3,
+    "cost_sd": 0.1,             # relative to production_cost
+    "signal_accuracy": 0.7      # probability a firm's signal names the true awareness level
+}
+BAYESIAN_MAX_TYPES = 16                # Types per firm
+BAYESIAN_MAX_PROFILES = 1 << 36        # Type-contingent profiles left to search after pruning
+BAYESIAN_CHUNK_SIZE = 1 << 12
+BAYESIAN_SEARCH_TIME_BUDGET = 2.0
+MAX_BAYESIAN_EQUILIBRIA = 100
+
+# Repeated-game collusion: can "everyone maintains" be sustained? Critical
+# discount factors come from the baseline game and from Monte Carlo draws of
+# its inputs (MONTE_CARLO_DISTRIBUTIONS).
+COLLUSION_DISCOUNT_FACTOR = 0.9        # Per-period discount factor the sustainability shares refer to
+COLLUSION_DEFAULT_SAMPLES = 1000
+COLLUSION_MAX_SAMPLES = 20000
+COLLUSION_QUANTILES = [0.05, 0.5, 0.95]
+
+def company_brand_loyalty(company, consumer_data):
+    brand_key = f"{company.lower().replace(' ', '_')}_brand_loyalty"
+    return consumer_data.get(brand_key, 7.0) / 10
+
+# One product document per company, in the order given
+def unique_company_docs(products):
+    company_docs = {}
+    for product in products:
+        company_docs.setdefault(product["company"], product)
+    return list(company_docs.values())
+
+# Get one product document per company for the given year, in insertion order
+def load_year_products(year):
+    return unique_company_docs(products_collection.find({"year": year}).sort("_id", 1))
+
+# Per-company arrays and market-wide scalars the payoff model works on
+def payoff_inputs(company_docs, consumer_data, economic_data):
+    return {
+        "companies": [doc["company"] for doc in company_docs],
+        "price": np.array([doc["price"] for doc in company_docs], dtype=float),
+        # Add a default value if production_cost is missing
+        "cost": np.array([doc.get("production_cost", doc["price"] * 0.5) for doc in company_docs], dtype=float),
+        "market_share": np.array([doc["market_share"] for doc in company_docs], dtype=float),
+        "loyalty": np.array([company_brand_loyalty(doc["company"], consumer_data) for doc in company_docs]),
+        "awareness": consumer_data["shrinkflation_awareness"] / 100,
+        "confidence": economic_data["consumer_confidence_index"]
+    }
+
+# Payoff of the given players for their own shrink fraction and price change,
+# given how many rivals shrink, the rivals' total shrink intensity (in units of
+# the reference 5% shrink) and the rivals' average price change. Arrays
+# broadcast with players on the second to last axis. Inputs may carry leading
+# batch axes (e.g. one row per scenario) in front of a three-axis layout.
+def strategy_payoffs(inputs, players, own_shrink, own_price_change, rivals_shrinking, rival_intensity, rival_price_change, n_players, model=PAYOFF_MODEL):
+    return strategy_outcomes(inputs, players, own_shrink, own_price_change, rivals_shrinking, rival_intensity, rival_price_change, n_players, model)["payoff"]
+
+# Resulting market share and payoff of the given players, same arguments
+# A given share_change replaces the rule-based market share adjustments.
+def strategy_outcomes(inputs, players, own_shrink, own_price_change, rivals_shrinking, rival_intensity, rival_price_change, n_players, model=PAYOFF_MODEL, share_change=None):
+    batch_shape = np.shape(inputs["awareness"])
+    shape = batch_shape + (1, len(players), 1)
+    price = inputs["price"][..., players].reshape(shape)
+    cost = inputs["cost"][..., players].reshape(shape)
+    market_share = inputs["market_share"][..., players].reshape(shape)
+    loyalty = inputs["loyalty"][..., players].reshape(shape)
+    awareness_penalty = np.reshape(inputs["awareness"], batch_shape + (1, 1, 1))
+    confidence = np.reshape(inputs["confidence"], batch_shape + (1, 1, 1))
     
-    if not all([milk_bikis_data, good_day_data, parle_g_data, market_data, consumer_data, economic_data]):
-        return None
+    own = own_shrink > 0
+    intensity = own_shrink / (1 - model["shrink_size_factor"])
+    mean_rival_intensity = rival_intensity / max(n_players - 1, 1)
+    no_rival_shrinks = rivals_shrinking == 0
+    all_rivals_shrink = rivals_shrinking == n_players - 1
+    
+    # Market share adjustments, first matching rule wins
+    market_share_change = np.select(
+        [own & no_rival_shrinks, ~own & all_rivals_shrink, own & all_rivals_shrink, own & ~all_rivals_shrink],
+        [-awareness_penalty * (1 - loyalty) * model["solo_shrink_penalty"] * intensity,
+         awareness_penalty * model["lone_maintain_bonus"] * mean_rival_intensity,
+         -awareness_penalty * model["all_shrink_penalty"] * intensity,
+         -awareness_penalty * (1 - loyalty) * model["partial_shrink_penalty"] * intensity],
+        default=0.0
+    )
     
-    # Create a 2x2x2 game (3 players, 2 strategies each: maintain or shrink)
-    # Since pygambit has API issues, we'll implement our own game theory logic
+    # Adjust for economic conditions
+    if model["economic_adjustment"]:
+        market_share_change = market_share_change * (confidence / model["confidence_baseline"])
     
-    # Define payoff calculation function based on multiple factors
-    def calculate_payoff(company_data, strategy, competitor1_data, competitor1_strategy, 
-                         competitor2_data, competitor2_strategy, market_data, consumer_data):
-        
-        # Base profit calculation
-        current_size = company_data["size"]
-        current_price = company_data["price"]
-        # Add a default value if production_cost is missing
-        production_cost = company_data.get("production_cost", current_price * 0.5)  # Default to 50% of price if missing
-        market_share = company_data["market_share"]
+    if share_change is not None:
+        market_share_change = share_change
+    
+    # Pricing above the rivals' average loses share
+    market_share_change = market_share_change - model["price_share_elasticity"] * (own_price_change - rival_price_change) * 100
+    
+    new_market_share = market_share
+    if model["share_adjustment"]:
+        new_market_share = market_share + market_share_change
+    
+    new_cost = cost * (1 - (1 - model["shrink_cost_factor"]) * intensity)
+    base_profit = price * (1 + own_price_change) - new_cost
+    
+    units_sold = model["market_size"] * new_market_share / 100
+    total_profit = units_sold * base_profit
+    
+    # Normalize to a 0-10 scale for the game
+    return {
+        "market_share": new_market_share,
+        "payoff": round_half_exact(np.clip(total_profit / model["payoff_scale"], 0, model["payoff_cap"]), 2)
+    }
+
+# Round like Python's round() on each float. np.round scales before rounding
+# half to even, so values such as 5.565 (stored just above the half) would
+# round down; values within reach of a half are rounded one by one instead.
+def round_half_exact(values, decimals):
+    scaled = np.asarray(values, dtype=float) * 10 ** decimals
+    rounded = np.array(np.round(scaled) / 10 ** decimals)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(float(value), decimals) for value in np.asarray(values, dtype=float)[near_half]]
+    return rounded
+
+# In the maintain/shrink game a player's payoff only depends on its own
+# strategy and how many rivals shrink, so the game is fully described by
+# table[i, s, k]: the payoff of player i playing STRATEGIES[s] while k of its
+# rivals shrink.
+def compute_payoff_table(company_docs, consumer_data, economic_data, model=PAYOFF_MODEL):
+    return payoff_table_from_inputs(payoff_inputs(company_docs, consumer_data, economic_data), model)
+
+# Payoff table from payoff inputs; batched inputs give one table per batch
+# entry, shaped (..., player, strategy, rivals). A share_change table of the
+# same shape replaces the rule-based market share adjustments.
+def payoff_table_from_inputs(inputs, model=PAYOFF_MODEL, share_change=None):
+    n_players = len(inputs["companies"])
+    batch_shape = np.shape(inputs["awareness"])
+    own_shrink = np.array([0.0, 1 - model["shrink_size_factor"]]).reshape(2, 1, 1)
+    rivals_shrinking = np.arange(n_players).reshape(1, 1, -1)
+    if share_change is not None:
+        share_change = np.swapaxes(share_change, -3, -2)
+    
+    # Every shrinking rival shrinks by the reference amount, nobody moves prices.
+    # Evaluated as (strategy, player, rivals) and returned as (player, strategy, rivals).
+    table = strategy_outcomes(
+        inputs, np.arange(n_players), own_shrink, 0.0,
+        rivals_shrinking, rivals_shrinking.astype(float), 0.0,
+        n_players, model, share_change
+    )["payoff"]
+    table = np.broadcast_to(table, batch_shape + (2, n_players, n_players))
+    return np.swapaxes(table, -3, -2).copy()
+
+# Shrink indicator of every player broadcast along its own axis, plus the
+# number of shrinking players in each profile of the profile tensor. When an
+# (N x 2) mask of available strategies is given, each axis only spans the
+# strategies the player has left.
+def strategy_axes(n_players, available=None):
+    if available is None:
+        available = np.ones((n_players, 2), dtype=bool)
+    axes = [np.flatnonzero(available[i]).astype(np.int8).reshape([-1 if j == i else 1 for j in range(n_players)]) for i in range(n_players)]
+    total_shrinking = np.zeros([axis.size for axis in axes], dtype=np.int8)
+    for axis in axes:
+        total_shrinking = total_shrinking + axis
+    return axes, total_shrinking
+
+def player_payoff_tensor(payoff_table, i, axes, total_shrinking):
+    return payoff_table[..., i, :, :][..., axes[i], total_shrinking - axes[i]]
+
+# Full (players x strategy-profile) tensor: tensor[i][s_0, ..., s_n-1]
+def compute_payoff_tensor(payoff_table):
+    axes, total_shrinking = strategy_axes(payoff_table.shape[0])
+    return np.stack([player_payoff_tensor(payoff_table, i, axes, total_shrinking) for i in range(payoff_table.shape[0])])
+
+def total_payoff_tensor(payoff_table):
+    axes, total_shrinking = strategy_axes(payoff_table.shape[0])
+    total = np.zeros(total_shrinking.shape)
+    for i in range(payoff_table.shape[0]):
+        total += player_payoff_tensor(payoff_table, i, axes, total_shrinking)
+    return total
+
+# Iterated elimination of dominated strategies. A player's payoff only depends
+# on the number of shrinking rivals, so a strategy is dominated when it loses
+# over the whole window of rival counts the surviving strategies can produce.
+# Returns the (N x 2) mask of surviving strategies and the elimination steps.
+# Batched tables (..., N, 2, N) are reduced together; their steps carry the
+# batch index in front of the player.
+def eliminate_dominated_strategies(payoff_table, weak=False):
+    n_players = payoff_table.shape[-3]
+    available = np.ones(payoff_table.shape[:-2] + (2,), dtype=bool)
+    gains = payoff_table[..., 1, :] - payoff_table[..., 0, :]
+    rival_counts = np.arange(n_players)
+    steps = []
+    
+    for round_number in range(1, n_players + 1):
+        only_shrink = ~available[..., 0]
+        undecided = available.all(axis=-1)
+        forced = only_shrink.sum(axis=-1, keepdims=True) - only_shrink
+        free = undecided.sum(axis=-1, keepdims=True) - undecided
+        feasible = (rival_counts >= forced[..., np.newaxis]) & (rival_counts <= (forced + free)[..., np.newaxis])
         
-        # Adjust size and cost based on strategy
-        if strategy == "shrink":
-            # Shrink by 5%
-            new_size = current_size * 0.95
-            # Production cost decreases by 3%
-            new_cost = production_cost * 0.97
+        if weak:
+            shrink_dominates = np.all((gains >= 0) | ~feasible, axis=-1) & np.any((gains > 0) & feasible, axis=-1)
+            maintain_dominates = np.all((gains <= 0) | ~feasible, axis=-1) & np.any((gains < 0) & feasible, axis=-1)
         else:
-            new_size = current_size
-            new_cost = production_cost
-        
-        # Calculate base profit
-        base_profit = current_price - new_cost
-        
-        # Adjust market share based on strategies
-        # Consumer awareness penalty
-        awareness_penalty = consumer_data["shrinkflation_awareness"] / 100
-        
-        # Brand loyalty protection
-        brand_key = f"{company_data['company'].lower().replace(' ', '_')}_brand_loyalty"
-        brand_loyalty = consumer_data.get(brand_key, 7.0) / 10
+            shrink_dominates = np.all((gains > 0) | ~feasible, axis=-1)
+            maintain_dominates = np.all((gains < 0) | ~feasible, axis=-1)
         
-        # Market share adjustments
-        market_share_change = 0
+        drop_maintain = undecided & shrink_dominates
+        drop_shrink = undecided & maintain_dominates & ~drop_maintain
+        if not (drop_maintain.any() or drop_shrink.any()):
+            break
         
-        # If company shrinks but competitors don't
-        if strategy == "shrink" and competitor1_strategy == "maintain" and competitor2_strategy == "maintain":
-            # Penalty for being the only one to shrink
-            market_share_change -= awareness_penalty * (1 - brand_loyalty) * 2
-        
-        # If company maintains but competitors shrink
-        elif strategy == "maintain" and competitor1_strategy == "shrink" and competitor2_strategy == "shrink":
-            # Bonus for being the only one to maintain
-            market_share_change += awareness_penalty * 1.5
-        
-        # If everyone shrinks
-        elif strategy == "shrink" and competitor1_strategy == "shrink" and competitor2_strategy == "shrink":
-            # Small penalty as consumers have no alternative
-            market_share_change -= awareness_penalty * 0.5
-        
-        # If company shrinks and one competitor maintains
-        elif strategy == "shrink" and (competitor1_strategy == "maintain" or competitor2_strategy == "maintain"):
-            # Moderate penalty
-            market_share_change -= awareness_penalty * (1 - brand_loyalty)
-        
-        # Adjust for economic conditions
-        economic_factor = economic_data["consumer_confidence_index"] / 70  # Normalize around 70
-        market_share_change *= economic_factor
+        available[drop_maintain, 0] = False
+        available[drop_shrink, 1] = False
+        steps += [(round_number,) + tuple(int(j) for j in index) + (0,) for index in np.argwhere(drop_maintain)]
+        steps += [(round_number,) + tuple(int(j) for j in index) + (1,) for index in np.argwhere(drop_shrink)]
+    
+    return available, steps
+
+def dominance_summary(companies, available, steps):
+    return {
+        "strategies": {company: [STRATEGIES[s] for s in range(2) if available[i, s]] for i, company in enumerate(companies)},
+        "eliminated": [
+            {"round": round_number, "company": companies[i], "strategy": STRATEGIES[s]}
+            for round_number, i, s in sorted(steps)
+        ],
+        "profiles": int(np.prod(available.sum(axis=1)))
+    }
+
+# Reduce the game before searching for equilibria. Strict elimination keeps
+# every Nash equilibrium, so the search runs on the strictly reduced game;
+# the weakly reduced game is only reported.
+def reduce_game(payoff_table, companies):
+    return reduce_games(payoff_table[np.newaxis], companies)[0]
+
+# reduce_game for a stack of tables (B, N, 2, N), eliminated together.
+# Returns one (strict mask, dominance summary) pair per table.
+def reduce_games(payoff_tables, companies):
+    strict_available, strict_steps = eliminate_dominated_strategies(payoff_tables)
+    weak_available, weak_steps = eliminate_dominated_strategies(payoff_tables, weak=True)
+    table_strict_steps = [[] for _ in payoff_tables]
+    for round_number, index, i, s in strict_steps:
+        table_strict_steps[index].append((round_number, i, s))
+    table_weak_steps = [[] for _ in payoff_tables]
+    for round_number, index, i, s in weak_steps:
+        table_weak_steps[index].append((round_number, i, s))
+    
+    return [
+        (strict_available[index], {
+            "original_profiles": 2 ** len(companies),
+            "strict": dominance_summary(companies, strict_available[index], table_strict_steps[index]),
+            "weak": dominance_summary(companies, weak_available[index], table_weak_steps[index])
+        })
+        for index in range(len(payoff_tables))
+    ]
+
+# Boolean mask over profiles where no player gains from a unilateral deviation.
+# One best-response check per player axis instead of a loop over profiles.
+# Batched tables give one mask per batch entry, profile axes last.
+def find_pure_nash_mask(payoff_table, available=None):
+    n_players = payoff_table.shape[-3]
+    axes, total_shrinking = strategy_axes(n_players, available)
+    mask = np.ones(payoff_table.shape[:-3] + total_shrinking.shape, dtype=bool)
+    for i in range(n_players):
+        player_payoffs = player_payoff_tensor(payoff_table, i, axes, total_shrinking)
+        mask &= player_payoffs >= player_payoffs.max(axis=i - n_players, keepdims=True)
+    return mask
+
+# Pure Nash equilibria as strategy-index profiles, in row-major profile order.
+# With a strictly reduced game only the surviving profiles are scanned.
+def find_pure_nash_profiles(payoff_table, available=None):
+    axes, _ = strategy_axes(payoff_table.shape[0], available)
+    return [
+        tuple(int(axes[i].flat[index]) for i, index in enumerate(profile))
+        for profile in np.argwhere(find_pure_nash_mask(payoff_table, available))
+    ]
+
+# dist[..., i, k] is the probability that k rivals of player i shrink when
+# every player j shrinks independently with probability p[..., j]. Leading
+# axes of p are batch axes; the recursion runs with them last so large
+# batches stay contiguous.
+def rival_shrink_distribution(p):
+    n_players = p.shape[-1]
+    p = np.moveaxis(np.asarray(p, dtype=float), -1, 0)
+    dist = np.zeros((n_players, n_players + 1) + p.shape[1:])
+    dist[:, 0] = 1.0
+    for j in range(n_players):
+        q = np.repeat(p[j][np.newaxis], n_players, axis=0)
+        q[j] = 0.0
+        q = q[:, np.newaxis]
+        dist[:, 1:] = dist[:, 1:] * (1 - q) + dist[:, :-1] * q
+        dist[:, :1] *= 1 - q
+    return np.moveaxis(dist[:, :n_players], (0, 1), (-2, -1))
+
+# Expected payoff of each player for each pure strategy against the mixed profile p
+def expected_strategy_payoffs(payoff_table, p):
+    dist = np.moveaxis(rival_shrink_distribution(p), (-2, -1), (0, 1))
+    expected = np.einsum("isk,ik...->is...", payoff_table, dist)
+    return np.moveaxis(expected, (0, 1), (-2, -1))
+
+def mixed_strategy_gains(payoff_table, p):
+    expected = expected_strategy_payoffs(payoff_table, p)
+    return expected[..., 1] - expected[..., 0]
+
+# How much each player could gain by deviating from the mixed profile p
+def mixed_strategy_regret(payoff_table, p):
+    expected = expected_strategy_payoffs(payoff_table, p)
+    value = p * expected[..., 1] + (1 - p) * expected[..., 0]
+    return expected.max(axis=-1) - value
+
+def add_mixed_equilibrium(equilibria, payoff_table, p):
+    p = np.clip(p, 0.0, 1.0)
+    if np.all(np.isfinite(p)) and mixed_strategy_regret(payoff_table, p).max() <= MIXED_NASH_TOLERANCE:
+        if not any(np.allclose(p, other, atol=1e-4) for other in equilibria):
+            equilibria.append(p)
+
+# Solve the indifference conditions of the mixing players for a fixed support.
+# A player's own gain does not depend on its own mix, so supports with fewer
+# than two mixing players only admit degenerate equilibria and are skipped.
+def solve_support(payoff_table, support, starts):
+    mixed = [i for i, s in enumerate(support) if s == 2]
+    base = np.array([1.0 if s == 1 else 0.0 for s in support])
+    
+    def indifference(x):
+        p = base.copy()
+        p[mixed] = x
+        return mixed_strategy_gains(payoff_table, p)[mixed]
+    
+    solutions = []
+    for start in starts:
+        sol = optimize.root(indifference, start[mixed], method="hybr")
+        if sol.success and np.all((sol.x > 0) & (sol.x < 1)):
+            p = base.copy()
+            p[mixed] = sol.x
+            solutions.append(p)
+    return solutions
+
+def support_enumeration(payoff_table, deadline, available):
+    n_players = payoff_table.shape[0]
+    rng = np.random.default_rng(0)
+    starts = [np.full(n_players, 0.5)] + [rng.uniform(0.05, 0.95, n_players) for _ in range(3)]
+    equilibria = []
+    
+    # Players left with a single strategy always play it
+    options = [(0, 1, 2) if available[i].all() else (int(np.flatnonzero(available[i])[0]),) for i in range(n_players)]
+    for support in itertools.product(*options):
+        if support.count(2) < 2:
+            continue
+        if time.monotonic() > deadline:
+            return equilibria, False
+        for p in solve_support(payoff_table, support, starts):
+            add_mixed_equilibrium(equilibria, payoff_table, p)
+    
+    return equilibria, True
+
+# Follow the logit response path x = lambda * gain(expit(x)) from the uniform
+# mix at lambda = 0 towards lambda -> infinity, where it converges to a Nash
+# equilibrium, then polish the limit on the support it selects.
+def logit_homotopy(payoff_table, deadline, lambda_max=1e4, steps=60):
+    x = np.zeros(payoff_table.shape[0])
+    
+    for lam in np.geomspace(0.1, lambda_max, steps):
+        if time.monotonic() > deadline:
+            return [], False
+        sol = optimize.root(lambda z: z - lam * mixed_strategy_gains(payoff_table, expit(z)), x, method="hybr")
+        if not sol.success:
+            break
+        x = sol.x
+    
+    p = expit(x)
+    support = tuple(2 if 1e-3 < pi < 1 - 1e-3 else int(pi >= 0.5) for pi in p)
+    equilibria = []
+    if support.count(2) >= 2:
+        for polished in solve_support(payoff_table, support, [p]):
+            add_mixed_equilibrium(equilibria, payoff_table, polished)
+    add_mixed_equilibrium(equilibria, payoff_table, np.where(np.array(support) == 2, p, support))
+    return equilibria, True
+
+# Mixed strategy Nash equilibria as arrays of shrink probabilities, plus a
+# summary of the search. Stops early once time_budget seconds have passed.
+# Support enumeration only mixes players that still have both strategies.
+def find_mixed_nash_equilibria(payoff_table, time_budget=MIXED_NASH_TIME_BUDGET, available=None):
+    started = time.monotonic()
+    deadline = started + time_budget
+    if available is None:
+        available = np.ones((payoff_table.shape[0], 2), dtype=bool)
+    
+    if available.all(axis=1).sum() <= SUPPORT_ENUMERATION_MAX_PLAYERS:
+        method = "support_enumeration"
+        equilibria, complete = support_enumeration(payoff_table, deadline, available)
+    else:
+        method = "logit_homotopy"
+        equilibria, complete = logit_homotopy(payoff_table, deadline)
+    
+    return equilibria, {
+        "method": method,
+        "complete": complete,
+        "elapsed": round(time.monotonic() - started, 4)
+    }
+
+def format_mixed_profile(companies, p):
+    parts = []
+    for company, shrink_probability in zip(companies, p):
+        if shrink_probability <= 1e-4:
+            parts.append(f"{company}: Maintain")
+        elif shrink_probability >= 1 - 1e-4:
+            parts.append(f"{company}: Shrink")
+        else:
+            parts.append(f"{company}: Shrink {shrink_probability * 100:.0f}% / Maintain {(1 - shrink_probability) * 100:.0f}%")
+    return ", ".join(parts)
+
+def mixed_equilibrium_summary(payoff_table, companies, p):
+    expected = expected_strategy_payoffs(payoff_table, p)
+    value = p * expected[:, 1] + (1 - p) * expected[:, 0]
+    return {
+        "strategies": {
+            company: {"maintain": round(float(1 - p[i]), 4), "shrink": round(float(p[i]), 4)}
+            for i, company in enumerate(companies)
+        },
+        "expected_payoffs": {company: round(float(value[i]), 4) for i, company in enumerate(companies)}
+    }
+
+# Incentive constraints of a correlated equilibrium as a sparse (2N x 2^N)
+# matrix over profile probabilities: row (i, s) sums what player i would gain
+# by switching away from s whenever it is told to play s, which must not be
+# positive. Also returns the (N x 2^N) payoffs by row-major profile.
+def correlated_equilibrium_constraints(payoff_table):
+    tensor = compute_payoff_tensor(payoff_table)
+    n_players = tensor.shape[0]
+    payoffs = tensor.reshape(n_players, -1)
+    n_profiles = payoffs.shape[1]
+    
+    deviation_gains = np.stack([np.flip(tensor[i], axis=i).ravel() for i in range(n_players)]) - payoffs
+    told = np.array(np.unravel_index(np.arange(n_profiles), tensor.shape[1:]))
+    rows = 2 * np.arange(n_players)[:, np.newaxis] + told
+    columns = np.broadcast_to(np.arange(n_profiles), rows.shape)
+    constraints = sparse.csr_matrix((deviation_gains.ravel(), (rows.ravel(), columns.ravel())), shape=(2 * n_players, n_profiles))
+    return constraints, payoffs
+
+# Correlated equilibrium maximizing total payoff ("welfare") or the lowest
+# player's expected payoff ("egalitarian"). Returns the distribution over
+# row-major profiles, or None when the solver fails.
+def solve_correlated_equilibrium(payoff_table, objective="welfare"):
+    constraints, payoffs = correlated_equilibrium_constraints(payoff_table)
+    n_players, n_profiles = payoffs.shape
+    
+    if objective == "welfare":
+        cost = -payoffs.sum(axis=0)
+        a_ub = constraints
+        a_eq = sparse.csr_matrix(np.ones((1, n_profiles)))
+    else:
+        # One more variable t, the lowest expected payoff: t <= payoffs[i] . p
+        cost = np.append(np.zeros(n_profiles), -1.0)
+        a_ub = sparse.vstack([
+            sparse.hstack([constraints, sparse.csr_matrix((2 * n_players, 1))]),
+            sparse.hstack([sparse.csr_matrix(-payoffs), sparse.csr_matrix(np.ones((n_players, 1)))])
+        ], format="csr")
+        a_eq = sparse.csr_matrix(np.append(np.ones(n_profiles), 0.0)[np.newaxis])
+    
+    result = optimize.linprog(
+        cost, A_ub=a_ub, b_ub=np.zeros(a_ub.shape[0]), A_eq=a_eq, b_eq=[1.0],
+        bounds=[(0, None)] * n_profiles + [(None, None)] * (len(cost) - n_profiles), method="highs"
+    )
+    if not result.success:
+        return None
+    distribution = np.clip(result.x[:n_profiles], 0.0, None)
+    return distribution / distribution.sum()
+
+def correlated_equilibrium_summary(payoff_table, companies, distribution):
+    _, payoffs = correlated_equilibrium_constraints(payoff_table)
+    expected = payoffs @ distribution
+    shape = (2,) * len(companies)
+    return {
+        "distribution": [
+            {
+                "profile": format_profile(companies, np.unravel_index(index, shape)),
+                "probability": round(float(distribution[index]), 4)
+            }
+            for index in np.argsort(-distribution, kind="stable") if distribution[index] >= CORRELATED_EQUILIBRIUM_MIN_PROBABILITY
+        ],
+        "expected_payoffs": {company: round(float(expected[i]), 4) for i, company in enumerate(companies)},
+        "welfare": round(float(expected.sum()), 4)
+    }
+
+# Welfare-maximizing and egalitarian correlated equilibria of the game
+def find_correlated_equilibria(payoff_table, companies):
+    if len(companies) > CORRELATED_EQUILIBRIUM_MAX_PLAYERS:
+        return None
+    started = time.monotonic()
+    result = {}
+    for objective in ["welfare", "egalitarian"]:
+        distribution = solve_correlated_equilibrium(payoff_table, objective)
+        result[objective] = correlated_equilibrium_summary(payoff_table, companies, distribution) if distribution is not None else None
+    result["elapsed"] = round(time.monotonic() - started, 4)
+    return result
+
+# Gain from shrinking of every player against the mixed profiles p, for
+# gain tables gain[..., i, k] = table[..., i, 1, k] - table[..., i, 0, k]
+def shrink_gains(gain_table, p):
+    return np.einsum("...ik,...ik->...i", rival_shrink_distribution(p), gain_table)
+
+# jacobian[..., i, j] = d gain_i / d p_j. Gains are linear in each rival's
+# probability, so the derivative is the gain with p_j = 1 minus with p_j = 0.
+def shrink_gain_jacobian(gain_table, p):
+    own = np.eye(p.shape[-1], dtype=bool)
+    high = np.where(own, 1.0, p[..., np.newaxis, :])
+    low = np.where(own, 0.0, p[..., np.newaxis, :])
+    gain_table = gain_table[..., np.newaxis, :, :]
+    return np.swapaxes(shrink_gains(gain_table, high) - shrink_gains(gain_table, low), -1, -2)
+
+# Residual p - expit(lambda * gain(p)) of the logit QRE and its Jacobian with
+# respect to (p, nu), shaped (..., N) and (..., N, N + 1)
+def qre_system(gain_table, z):
+    p, nu = z[..., :-1], z[..., -1]
+    lam = (nu / (1 - nu))[..., np.newaxis]
+    gains = shrink_gains(gain_table, p)
+    q = expit(lam * gains)
+    slope = q * (1 - q)
+    
+    residual = p - q
+    d_p = np.eye(p.shape[-1]) - (lam * slope)[..., np.newaxis] * shrink_gain_jacobian(gain_table, p)
+    d_nu = -slope * gains / ((1 - nu) ** 2)[..., np.newaxis]
+    return residual, np.concatenate([d_p, d_nu[..., np.newaxis]], axis=-1)
+
+# Batched linear solve that falls back to the pseudo-inverse at singular points
+def solve_linear_batch(a, b):
+    try:
+        return np.linalg.solve(a, b[..., np.newaxis])[..., 0]
+    except np.linalg.LinAlgError:
+        return (np.linalg.pinv(a) @ b[..., np.newaxis])[..., 0]
+
+# Trace the principal logit QRE branch of a batch of games (..., N, 2, N),
+# e.g. one table per year, from the centroid at lambda = 0 towards the Nash
+# equilibrium it selects. Every game takes its own adaptive steps along the
+# curve, but all games step together. Returns per game the path as lambda
+# values and shrink probabilities, and whether it reached QRE_LAMBDA_MAX.
+def trace_logit_qre(payoff_tables, lambda_max=QRE_LAMBDA_MAX, max_steps=QRE_MAX_STEPS):
+    n_players = payoff_tables.shape[-3]
+    gain_table = (payoff_tables[..., 1, :] - payoff_tables[..., 0, :]).reshape(-1, n_players, n_players)
+    n_games = len(gain_table)
+    nu_max = lambda_max / (1 + lambda_max)
+    unit = np.zeros(n_players + 1)
+    unit[-1] = 1.0
+    
+    z = np.append(np.full(n_players, 0.5), 0.0)[np.newaxis].repeat(n_games, axis=0)
+    tangent = np.tile(unit, (n_games, 1))
+    step = np.full(n_games, QRE_INITIAL_STEP)
+    active = np.ones(n_games, dtype=bool)
+    complete = np.zeros(n_games, dtype=bool)
+    paths = [[z[g].copy()] for g in range(n_games)]
+    
+    for _ in range(max_steps):
+        if not active.any():
+            break
         
-        # Calculate new market share
-        new_market_share = market_share + market_share_change
+        # Predictor: unit tangent of the curve, oriented along the previous one
+        _, jacobian = qre_system(gain_table, z)
+        tangent = solve_linear_batch(np.concatenate([jacobian, tangent[:, np.newaxis]], axis=1), np.tile(unit, (n_games, 1)))
+        tangent /= np.linalg.norm(tangent, axis=1, keepdims=True)
+        # Do not step past nu_max
+        rising = tangent[:, -1] > 0
+        step = np.where(rising, np.minimum(step, (nu_max - z[:, -1]) / np.where(rising, tangent[:, -1], 1.0)), step)
+        predicted = z + step[:, np.newaxis] * tangent
         
-        # Calculate profit based on market share and profit margin
-        market_size = 1000000  # Assumed market size in units
-        units_sold = (market_size * new_market_share / 100)
-        total_profit = units_sold * base_profit
+        # Corrector: Newton on the residual, moving perpendicular to the tangent
+        corrected = predicted.copy()
+        for _ in range(QRE_NEWTON_STEPS):
+            residual, jacobian = qre_system(gain_table, corrected)
+            arclength = np.einsum("gi,gi->g", tangent, corrected - predicted)
+            corrected -= solve_linear_batch(
+                np.concatenate([jacobian, tangent[:, np.newaxis]], axis=1),
+                np.concatenate([residual, arclength[:, np.newaxis]], axis=1)
+            )
+            corrected[:, -1] = np.minimum(corrected[:, -1], nu_max)
+        residual, _ = qre_system(gain_table, corrected)
         
-        # Normalize to a 0-10 scale for the game
-        normalized_profit = min(10, max(0, total_profit / 1000000))
+        accepted = active & np.all(np.isfinite(corrected), axis=1) & (np.abs(residual).max(axis=1) < QRE_TOLERANCE)
+        accepted &= (corrected[:, -1] >= 0)
+        z[accepted] = corrected[accepted]
+        step = np.where(accepted, np.minimum(step * 1.5, QRE_MAX_STEP), step * 0.5)
+        for g in np.flatnonzero(accepted):
+            paths[g].append(z[g].copy())
         
-        return round(normalized_profit, 2)
+        complete |= accepted & (z[:, -1] >= nu_max * (1 - 1e-12))
+        active &= ~complete & (step >= QRE_MIN_STEP)
+    
+    results = []
+    for g in range(n_games):
+        path = np.array(paths[g])
+        nu = path[:, -1]
+        results.append({
+            "lambda": nu / (1 - nu),
+            "shrink": np.clip(path[:, :-1], 0.0, 1.0),
+            "complete": bool(complete[g])
+        })
+    return results
+
+# Shrink probabilities where the path first reaches lam, interpolated
+# between the bracketing path points
+def qre_at_lambda(path, lam):
+    reached = np.flatnonzero(path["lambda"] >= lam)
+    if not len(reached):
+        return None
+    index = reached[0]
+    if index == 0:
+        return path["shrink"][0]
+    lam_low, lam_high = path["lambda"][index - 1], path["lambda"][index]
+    weight = (lam - lam_low) / (lam_high - lam_low)
+    return path["shrink"][index - 1] + weight * (path["shrink"][index] - path["shrink"][index - 1])
+
+def qre_summary(payoff_table, companies, path):
+    limit = path["shrink"][-1]
+    return {
+        "companies": companies,
+        "path": {
+            "lambda": np.round(path["lambda"], 6).tolist(),
+            "shrink": {company: np.round(path["shrink"][:, i], 6).tolist() for i, company in enumerate(companies)}
+        },
+        "at": [
+            {"lambda": lam, "shrink": {company: round(float(shrink[i]), 4) for i, company in enumerate(companies)}}
+            for lam, shrink in ((lam, qre_at_lambda(path, lam)) for lam in QRE_REPORT_LAMBDAS) if shrink is not None
+        ],
+        # The Nash equilibrium the logit path selects as lambda grows
+        "limit": {
+            "profile": format_mixed_profile(companies, limit),
+            "shrink": {company: round(float(limit[i]), 4) for i, company in enumerate(companies)},
+            "regret": round(float(mixed_strategy_regret(payoff_table, limit).max()), 4)
+        },
+        "complete": path["complete"],
+        "steps": len(path["lambda"]) - 1
+    }
+
+def format_profile(companies, profile):
+    return ", ".join(f"{company}: {STRATEGIES[s].capitalize()}" for company, s in zip(companies, profile))
+
+def profile_payoffs(payoff_table, companies, profile):
+    rivals = sum(profile)
+    return {company: float(payoff_table[i, profile[i], rivals - profile[i]]) for i, company in enumerate(companies)}
+
+# Convert the payoff table into the nested {strategy: {...: {company: payoff}}} dict
+def payoff_table_to_dict(payoff_table, companies):
+    def build(prefix):
+        if len(prefix) == len(companies):
+            return profile_payoffs(payoff_table, companies, prefix)
+        return {strategy: build(prefix + (s,)) for s, strategy in enumerate(STRATEGIES)}
+    return build(())
+
+# Simplified matrix over the first two players for visualization. The other
+# players shrink only when both of the first two shrink.
+def simplified_payoff_matrix(payoff_table, companies):
+    payoff_matrix = {}
+    for a, first_strategy in enumerate(STRATEGIES):
+        payoff_matrix[first_strategy] = {}
+        for b, second_strategy in enumerate(STRATEGIES):
+            rest = 1 if a == b == 1 else 0
+            profile = (a, b) + (rest,) * (len(companies) - 2)
+            payoff_matrix[first_strategy][second_strategy] = profile_payoffs(payoff_table, companies, profile)
+    return payoff_matrix
+
+# Build a (K x 2) grid of (shrink fraction, price change) strategies from
+# percentages, e.g. shrink 0-20% crossed with price changes of -5% to +10%
+def build_strategy_grid(shrink_levels, price_changes):
+    shrink_levels = sorted({float(level) for level in shrink_levels})
+    price_changes = sorted({float(change) for change in price_changes})
+    if not shrink_levels or not price_changes:
+        raise ValueError("Strategy grid needs at least one shrink level and one price change")
+    if any(level < 0 or level >= 100 for level in shrink_levels) or any(change <= -100 for change in price_changes):
+        raise ValueError("Shrink levels must be in [0, 100) and price changes above -100")
+    return np.array([(level / 100, change / 100) for level in shrink_levels for change in price_changes])
+
+# One strategy grid per company: the request's shared grid, optionally
+# overridden per company under "companies"
+def parse_strategy_grids(spec, companies):
+    overrides = spec.get("companies", {})
+    grids = []
+    for company in companies:
+        company_spec = overrides.get(company, {})
+        grids.append(build_strategy_grid(
+            company_spec.get("shrink_levels", spec.get("shrink_levels", DEFAULT_STRATEGY_GRID["shrink_levels"])),
+            company_spec.get("price_changes", spec.get("price_changes", DEFAULT_STRATEGY_GRID["price_changes"]))
+        ))
+    return grids
+
+def grid_strategy_label(shrink, price_change):
+    label = "maintain" if shrink == 0 else f"shrink {shrink * 100:g}%"
+    if price_change != 0:
+        label += f", price {price_change * 100:+g}%"
+    return label
+
+# Stack per-company grids into padded (N x K_max) arrays plus a validity mask
+def grid_arrays(grids):
+    k_max = max(len(grid) for grid in grids)
+    shrink = np.zeros((len(grids), k_max))
+    price_change = np.zeros((len(grids), k_max))
+    valid = np.zeros((len(grids), k_max), dtype=bool)
+    for i, grid in enumerate(grids):
+        shrink[i, :len(grid)] = grid[:, 0]
+        price_change[i, :len(grid)] = grid[:, 1]
+        valid[i, :len(grid)] = True
+    return shrink, price_change, valid
+
+# Enumerate a profile space chunk by chunk. choices[i] holds the strategy
+# indices player i may play; yields (C x N) arrays of strategy indices.
+def iter_profile_chunks(choices, chunk_size=GRID_CHUNK_SIZE):
+    shape = [len(c) for c in choices]
+    total = int(np.prod(shape, dtype=object))
+    for start in range(0, total, chunk_size):
+        local = np.unravel_index(np.arange(start, min(start + chunk_size, total)), shape)
+        yield np.stack([choices[i][local[i]] for i in range(len(choices))], axis=1)
+
+# Payoffs of the given players for every strategy on their grid against a
+# chunk of profiles: a (C x P x K_max) array, -inf on padded grid slots
+def grid_profile_payoffs(inputs, arrays, profiles, players, model=PAYOFF_MODEL):
+    shrink, price_change, valid = arrays
+    n_players = shrink.shape[0]
+    all_players = np.arange(n_players)
+    profile_shrink = shrink[all_players, profiles]
+    profile_price = price_change[all_players, profiles]
     
-    # Calculate all payoffs
-    payoffs = {}
-    strategies = ["maintain", "shrink"]
+    # Rival aggregates exclude the player's own current strategy
+    shrinking = profile_shrink > 0
+    intensity = profile_shrink / (1 - model["shrink_size_factor"])
+    rivals_shrinking = (shrinking.sum(axis=1, keepdims=True) - shrinking)[:, players]
+    rival_intensity = (intensity.sum(axis=1, keepdims=True) - intensity)[:, players]
+    rival_price_change = ((profile_price.sum(axis=1, keepdims=True) - profile_price) / max(n_players - 1, 1))[:, players]
+    
+    payoffs = strategy_payoffs(
+        inputs, players, shrink[players][np.newaxis], price_change[players][np.newaxis],
+        rivals_shrinking[..., np.newaxis], rival_intensity[..., np.newaxis], rival_price_change[..., np.newaxis],
+        n_players, model
+    )
+    return np.where(valid[players][np.newaxis], payoffs, -np.inf)
+
+# Iterated elimination of strictly dominated grid strategies. Each player's
+# rival profile space is scanned in chunks; a strategy goes when another one
+# beats it against every surviving rival profile.
+def eliminate_dominated_grid_strategies(inputs, arrays, deadline, model=PAYOFF_MODEL, chunk_size=GRID_CHUNK_SIZE):
+    valid = arrays[2]
+    n_players = valid.shape[0]
+    available = [np.flatnonzero(valid[i]) for i in range(n_players)]
+    steps = []
+    changed = True
+    round_number = 0
     
-    for mb_strategy in strategies:
-        if mb_strategy not in payoffs:
-            payoffs[mb_strategy] = {}
+    while changed:
+        changed = False
+        round_number += 1
+        for i in range(n_players):
+            own = available[i]
+            if len(own) < 2:
+                continue
             
-        for gd_strategy in strategies:
-            if gd_strategy not in payoffs[mb_strategy]:
-                payoffs[mb_strategy][gd_strategy] = {}
-                
-            for pg_strategy in strategies:
-                if pg_strategy not in payoffs[mb_strategy][gd_strategy]:
-                    payoffs[mb_strategy][gd_strategy][pg_strategy] = {}
-                
-                # Calculate Milk Bikis payoff
-                mb_payoff = calculate_payoff(
-                    milk_bikis_data, mb_strategy,
-                    good_day_data, gd_strategy,
-                    parle_g_data, pg_strategy,
-                    market_data, consumer_data
-                )
-                
-                # Calculate Good Day payoff
-                gd_payoff = calculate_payoff(
-                    good_day_data, gd_strategy,
-                    milk_bikis_data, mb_strategy,
-                    parle_g_data, pg_strategy,
-                    market_data, consumer_data
-                )
-                
-                # Calculate Parle G payoff
-                pg_payoff = calculate_payoff(
-                    parle_g_data, pg_strategy,
-                    milk_bikis_data, mb_strategy,
-                    good_day_data, gd_strategy,
-                    market_data, consumer_data
-                )
-                
-                payoffs[mb_strategy][gd_strategy][pg_strategy] = {
-                    "Milk Bikis": mb_payoff,
-                    "Good Day": gd_payoff,
-                    "Parle G": pg_payoff
-                }
+            choices = list(available)
+            choices[i] = own[:1]
+            # dominated_by[a, b]: strategy b beats strategy a everywhere
+            dominated_by = np.ones((len(own), len(own)), dtype=bool)
+            for profiles in iter_profile_chunks(choices, max(1, chunk_size // len(own))):
+                if time.monotonic() > deadline:
+                    return available, steps, False
+                payoffs = grid_profile_payoffs(inputs, arrays, profiles, np.array([i]), model)[:, 0, own]
+                dominated_by &= np.all(payoffs[:, np.newaxis, :] > payoffs[:, :, np.newaxis], axis=0)
+            np.fill_diagonal(dominated_by, False)
+            
+            keep = ~dominated_by.any(axis=1)
+            if not keep.all():
+                steps += [(round_number, i, int(s)) for s in own[~keep]]
+                available[i] = own[keep]
+                changed = True
+    
+    return available, steps, True
+
+# Pure Nash equilibria of a multi-level strategy game. The strictly reduced
+# profile space is scanned in chunks; every chunk evaluates each player's
+# payoff for all of its own strategies at once and keeps the profiles where
+# nobody has a better reply.
+def solve_strategy_grid(inputs, grids, model=PAYOFF_MODEL, time_budget=GRID_SEARCH_TIME_BUDGET,
+                        chunk_size=GRID_CHUNK_SIZE, max_equilibria=MAX_GRID_EQUILIBRIA):
+    started = time.monotonic()
+    deadline = started + time_budget
+    arrays = grid_arrays(grids)
+    n_players = len(grids)
+    all_players = np.arange(n_players)
+    
+    available, steps, reduction_complete = eliminate_dominated_grid_strategies(inputs, arrays, deadline, model, chunk_size)
+    reduced_profiles = int(np.prod([len(choices) for choices in available], dtype=object))
+    if reduced_profiles > GRID_MAX_PROFILES:
+        raise ValueError("Strategy grid is too large to search")
+    
+    equilibria = []
+    scanned = 0
+    complete = True
+    for profiles in iter_profile_chunks(available, chunk_size):
+        if time.monotonic() > deadline or len(equilibria) >= max_equilibria:
+            complete = False
+            break
+        payoffs = grid_profile_payoffs(inputs, arrays, profiles, all_players, model)
+        current = np.take_along_axis(payoffs, profiles[..., np.newaxis], axis=2)[..., 0]
+        is_equilibrium = np.all(current >= payoffs.max(axis=2), axis=1)
+        for row in np.flatnonzero(is_equilibrium)[:max_equilibria - len(equilibria)]:
+            equilibria.append((tuple(int(s) for s in profiles[row]), current[row]))
+        scanned += len(profiles)
+    
+    return {
+        "available": available,
+        "eliminated": steps,
+        "equilibria": equilibria,
+        "original_profiles": int(np.prod([len(grid) for grid in grids], dtype=object)),
+        "reduced_profiles": reduced_profiles,
+        "profiles_scanned": scanned,
+        "complete": complete and reduction_complete,
+        "elapsed": round(time.monotonic() - started, 4)
+    }
+
+# The maintain/shrink game as one strategy grid per company
+def binary_strategy_grids(n_players, model=PAYOFF_MODEL):
+    return [build_strategy_grid([0, (1 - model["shrink_size_factor"]) * 100], [0])] * n_players
+
+# Default move order: largest market share first
+def default_move_order(company_docs):
+    return sorted(range(len(company_docs)), key=lambda i: -company_docs[i]["market_share"])
+
+def parse_move_order(order, companies, default_order):
+    if order is None:
+        return default_order
+    if not isinstance(order, list) or len(set(order)) != len(order) or not set(order) <= set(companies):
+        raise ValueError("Move order must be a list of distinct companies")
+    # Unlisted companies follow in the default order
+    leaders = [companies.index(company) for company in order]
+    return leaders + [i for i in default_order if i not in leaders]
+
+# Subgame perfect equilibrium of the sequential game where players move one
+# at a time in the given order, each seeing every earlier move. A payoff only
+# depends on the player's own strategy and the rivals' aggregates (how many
+# shrink, total shrink intensity, total price change), so backward induction
+# runs over the reachable aggregate states instead of the full game tree:
+# each state maps to the final aggregates its subgame ends in. Ties go to the
+# earlier grid strategy.
+def solve_sequential_game(inputs, grids, order, model=PAYOFF_MODEL, max_states=STACKELBERG_MAX_STATES):
+    started = time.monotonic()
+    n_players = len(grids)
+    # Aggregate contribution (shrinking, intensity, price change) of every strategy
+    contributions = [
+        np.stack([grid[:, 0] > 0, grid[:, 0] / (1 - model["shrink_size_factor"]), grid[:, 1]], axis=1)
+        for grid in grids
+    ]
+    
+    # Forward pass: reachable aggregate states after each move, and where
+    # every strategy leads
+    states = [np.zeros((1, 3))]
+    transitions = []
+    for i in order:
+        reached = (states[-1][:, np.newaxis, :] + contributions[i][np.newaxis]).reshape(-1, 3)
+        unique_states, inverse = np.unique(np.round(reached, 9), axis=0, return_inverse=True)
+        if len(unique_states) > max_states:
+            raise ValueError("Sequential game has too many reachable states")
+        states.append(unique_states)
+        transitions.append(inverse.reshape(len(states[-2]), -1))
+    
+    # Backward pass: each mover picks its best strategy against the final
+    # aggregates the rest of the game leads to
+    final = states[-1]
+    choices = [None] * n_players
+    unique = True
+    for depth in range(n_players - 1, -1, -1):
+        i = order[depth]
+        ends = final[transitions[depth]]
+        rivals = ends - contributions[i][np.newaxis]
+        payoffs = strategy_payoffs(
+            inputs, np.array([i]), grids[i][:, 0].reshape(1, 1, -1), grids[i][:, 1].reshape(1, 1, -1),
+            rivals[:, np.newaxis, :, 0], rivals[:, np.newaxis, :, 1], rivals[:, np.newaxis, :, 2] / max(n_players - 1, 1),
+            n_players, model
+        )[:, 0]
+        best = payoffs.max(axis=1, keepdims=True)
+        unique &= not np.any((payoffs >= best - 1e-9).sum(axis=1) > 1)
+        choices[depth] = payoffs.argmax(axis=1)
+        final = ends[np.arange(len(ends)), choices[depth]]
+    
+    # Equilibrium path from the root
+    profile = [0] * n_players
+    state = 0
+    for depth, i in enumerate(order):
+        profile[i] = int(choices[depth][state])
+        state = transitions[depth][state, profile[i]]
+    end = states[-1][state]
+    payoffs = np.array([
+        strategy_payoffs(
+            inputs, np.array([i]), grids[i][profile[i], 0], grids[i][profile[i], 1],
+            end[0] - contributions[i][profile[i], 0], end[1] - contributions[i][profile[i], 1],
+            (end[2] - contributions[i][profile[i], 2]) / max(n_players - 1, 1), n_players, model
+        ).item()
+        for i in range(n_players)
+    ])
+    
+    return {
+        "profile": tuple(profile),
+        "payoffs": payoffs,
+        "unique": bool(unique),
+        "states": int(sum(len(level) for level in states)),
+        "elapsed": round(time.monotonic() - started, 4)
+    }
+
+# Sequential game of one year next to the simultaneous one: every mover's
+# equilibrium strategy and payoff, and its commitment value, the payoff gained
+# over its best simultaneous-move pure Nash equilibrium
+def stackelberg_summary(year, inputs, grids, order, time_budget=GRID_SEARCH_TIME_BUDGET):
+    companies = inputs["companies"]
+    sequential = solve_sequential_game(inputs, grids, order)
+    simultaneous = solve_strategy_grid(inputs, grids, time_budget=time_budget)
+    
+    moves = []
+    for position, i in enumerate(order):
+        shrink, price_change = grids[i][sequential["profile"][i]]
+        nash_payoffs = [float(payoffs[i]) for _, payoffs in simultaneous["equilibria"]]
+        simultaneous_payoff = max(nash_payoffs) if nash_payoffs else None
+        payoff = float(sequential["payoffs"][i])
+        moves.append({
+            "company": companies[i],
+            "position": position + 1,
+            "strategy": grid_strategy_label(shrink, price_change),
+            "shrink": round(float(shrink) * 100, 2),
+            "priceChange": round(float(price_change) * 100, 2),
+            "payoff": round(payoff, 4),
+            "simultaneous_payoff": round(simultaneous_payoff, 4) if simultaneous_payoff is not None else None,
+            "commitment_value": round(payoff - simultaneous_payoff, 4) if simultaneous_payoff is not None else None
+        })
+    
+    return {
+        "year": year,
+        "order": [companies[i] for i in order],
+        "leader": moves[0]["company"],
+        "commitment_value": moves[0]["commitment_value"],
+        "moves": moves,
+        "unique": sequential["unique"],
+        "simultaneous_equilibria": len(simultaneous["equilibria"]),
+        "simultaneous_complete": simultaneous["complete"],
+        "states": sequential["states"],
+        "elapsed": sequential["elapsed"]
+    }
+
+# Pure analysis kernel shared by the analysis and the simulation. Solves the
+# game for an in-memory snapshot ({"products", "market", "consumer",
+# "economic"}) with the given payoff model and never touches the database,
+# so it can run in worker pools, batch sweeps and benchmarks.
+def solve_game(snapshot, model=PAYOFF_MODEL, mixed_time_budget=MIXED_NASH_TIME_BUDGET):
+    company_docs = unique_company_docs(snapshot["products"])
+    consumer_data = snapshot["consumer"]
+    economic_data = snapshot["economic"]
+    
+    if len(company_docs) < 2 or not all([snapshot["market"], consumer_data, economic_data]):
+        return None
+    
+    # Create a 2^N game (N players, 2 strategies each: maintain or shrink)
+    companies = [doc["company"] for doc in company_docs]
+    
+    # Calculate all payoffs at once
+    payoff_table = compute_payoff_table(company_docs, consumer_data, economic_data, model)
+    game = solve_payoff_table(payoff_table, companies, mixed_time_budget)
+    game["company_docs"] = company_docs
+    game["company_data"] = company_metrics(company_docs, snapshot.get("prev_products", {}), game["recommendations"])
+    return game
+
+# Equilibria, recommendations and payoff views of one payoff table. The
+# simulation turns off the mixed, correlated and total payoff searches and
+# passes in the reduction and pure equilibria it found for all its scenarios
+# at once.
+def solve_payoff_table(payoff_table, companies, mixed_time_budget=MIXED_NASH_TIME_BUDGET,
+                       search_mixed=True, total_payoff_fallback=True, search_correlated=True,
+                       reduction=None, pure_profiles=None):
+    payoffs = payoff_table_to_dict(payoff_table, companies) if len(companies) <= MAX_FULL_PAYOFF_PLAYERS else None
+    
+    # Remove dominated strategies before searching for equilibria
+    available, dominance_elimination = reduction or reduce_game(payoff_table, companies)
     
     # Find Nash equilibria using best response analysis
-    nash_equilibria = []
-    
-    for mb_strategy in strategies:
-        for gd_strategy in strategies:
-            for pg_strategy in strategies:
-                # Check if this is a Nash equilibrium
-                mb_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Milk Bikis"]
-                gd_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Good Day"]
-                pg_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Parle G"]
-                
-                # Check if Milk Bikis can improve by changing strategy
-                mb_can_improve = False
-                other_strategy = "maintain" if mb_strategy == "shrink" else "shrink"
-                if payoffs[other_strategy][gd_strategy][pg_strategy]["Milk Bikis"] > mb_payoff:
-                    mb_can_improve = True
-                
-                # Check if Good Day can improve by changing strategy
-                gd_can_improve = False
-                other_strategy = "maintain" if gd_strategy == "shrink" else "shrink"
-                if payoffs[mb_strategy][other_strategy][pg_strategy]["Good Day"] > gd_payoff:
-                    gd_can_improve = True
-                
-                # Check if Parle G can improve by changing strategy
-                pg_can_improve = False
-                other_strategy = "maintain" if pg_strategy == "shrink" else "shrink"
-                if payoffs[mb_strategy][gd_strategy][other_strategy]["Parle G"] > pg_payoff:
-                    pg_can_improve = True
-                
-                # If no player can improve by changing strategy, this is a Nash equilibrium
-                if not (mb_can_improve or gd_can_improve or pg_can_improve):
-                    nash_equilibria.append(f"Milk Bikis: {mb_strategy.capitalize()}, Good Day: {gd_strategy.capitalize()}, Parle G: {pg_strategy.capitalize()}")
+    equilibrium_profiles = list(pure_profiles) if pure_profiles is not None else find_pure_nash_profiles(payoff_table, available)
+    nash_equilibria = [format_profile(companies, profile) for profile in equilibrium_profiles]
     
-    # If no Nash equilibrium is found, identify the most likely outcome
-    if not nash_equilibria:
-        # Find the strategy profile with the highest total payoff
-        max_total_payoff = 0
-        best_profile = None
-        
-        for mb_strategy in strategies:
-            for gd_strategy in strategies:
-                for pg_strategy in strategies:
-                    total_payoff = sum(payoffs[mb_strategy][gd_strategy][pg_strategy].values())
-                    if total_payoff > max_total_payoff:
-                        max_total_payoff = total_payoff
-                        best_profile = f"Milk Bikis: {mb_strategy.capitalize()}, Good Day: {gd_strategy.capitalize()}, Parle G: {pg_strategy.capitalize()}"
-        
-        nash_equilibria.append(f"{best_profile} (Dominant Total Payoff)")
+    # Without a pure equilibrium, look for mixed strategy equilibria
+    mixed_nash_equilibria = []
+    mixed_nash_search = None
+    
+    if not nash_equilibria and search_mixed:
+        mixed_profiles, mixed_nash_search = find_mixed_nash_equilibria(payoff_table, mixed_time_budget, available)
+        for p in mixed_profiles:
+            mixed_nash_equilibria.append(mixed_equilibrium_summary(payoff_table, companies, p))
+            # Recommend the strategy each company plays most often
+            equilibrium_profiles.append(tuple(int(shrink_probability > 0.5) for shrink_probability in p))
+            nash_equilibria.append(f"{format_mixed_profile(companies, p)} (Mixed Strategy)")
+    
+    # Correlated equilibria always exist and are cheap to solve as LPs
+    correlated_equilibrium = find_correlated_equilibria(payoff_table, companies) if search_correlated else None
     
-    # Determine recommendations based on Nash equilibria and payoffs
-    recommendations = {}
+    # If no equilibrium is found, identify the most likely outcome
+    if not nash_equilibria and total_payoff_fallback:
+        # Find the strategy profile with the highest total payoff
+        total_payoffs = total_payoff_tensor(payoff_table)
+        best_profile = tuple(int(s) for s in np.unravel_index(np.argmax(total_payoffs), total_payoffs.shape))
+        equilibrium_profiles.append(best_profile)
+        nash_equilibria.append(f"{format_profile(companies, best_profile)} (Dominant Total Payoff)")
     
-    # Extract strategies from the first Nash equilibrium
-    if nash_equilibria:
-        eq_parts = nash_equilibria[0].split(", ")
-        recommendations["Milk Bikis"] = eq_parts[0].split(": ")[1].lower()
-        recommendations["Good Day"] = eq_parts[1].split(": ")[1].lower()
-        recommendations["Parle G"] = eq_parts[2].split(": ")[1].lower()
+    # Determine recommendations from the first Nash equilibrium
+    if equilibrium_profiles:
+        recommendations = {company: STRATEGIES[s] for company, s in zip(companies, equilibrium_profiles[0])}
     else:
         # Default recommendations based on payoff analysis
-        recommendations["Milk Bikis"] = "maintain"
-        recommendations["Good Day"] = "maintain"
-        recommendations["Parle G"] = "maintain"
-    
-    # Create simplified payoff matrix for visualization
-    payoff_matrix = {
-        "maintain": {
-            "maintain": {
-                "Milk Bikis": payoffs["maintain"]["maintain"]["maintain"]["Milk Bikis"],
-                "Good Day": payoffs["maintain"]["maintain"]["maintain"]["Good Day"],
-                "Parle G": payoffs["maintain"]["maintain"]["maintain"]["Parle G"]
-            },
-            "shrink": {
-                "Milk Bikis": payoffs["maintain"]["shrink"]["maintain"]["Milk Bikis"],
-                "Good Day": payoffs["maintain"]["shrink"]["maintain"]["Good Day"],
-                "Parle G": payoffs["maintain"]["shrink"]["maintain"]["Parle G"]
-            }
-        },
-        "shrink": {
-            "maintain": {
-                "Milk Bikis": payoffs["shrink"]["maintain"]["maintain"]["Milk Bikis"],
-                "Good Day": payoffs["shrink"]["maintain"]["maintain"]["Good Day"],
-                "Parle G": payoffs["shrink"]["maintain"]["maintain"]["Parle G"]
-            },
-            "shrink": {
-                "Milk Bikis": payoffs["shrink"]["shrink"]["shrink"]["Milk Bikis"],
-                "Good Day": payoffs["shrink"]["shrink"]["shrink"]["Good Day"],
-                "Parle G": payoffs["shrink"]["shrink"]["shrink"]["Parle G"]
-            }
-        }
-    }
+        recommendations = {company: "maintain" for company in companies}
     
-    # Calculate additional metrics for each company
+    return {
+        "companies": companies,
+        "payoff_table": payoff_table,
+        "full_payoffs": payoffs,
+        "payoff_matrix": simplified_payoff_matrix(payoff_table, companies),
+        "dominance_elimination": dominance_elimination,
+        "equilibrium_profiles": equilibrium_profiles,
+        "nash_equilibrium": nash_equilibria,
+        "mixed_nash_equilibria": mixed_nash_equilibria,
+        "mixed_nash_search": mixed_nash_search,
+        "correlated_equilibrium": correlated_equilibrium,
+        "recommendations": recommendations
+    }
+
+# Size, price and margin metrics for each company, with changes against the
+# previous year's products by company
+def company_metrics(company_docs, prev_products, recommendations):
     company_data = {}
     
-    for company, company_obj in [("Milk Bikis", milk_bikis_data), ("Good Day", good_day_data), ("Parle G", parle_g_data)]:
+    for company_obj in company_docs:
+        company = company_obj["company"]
         # Get previous year data
-        prev_year = year - 1
-        prev_data = products_collection.find_one({"company": company, "year": prev_year})
+        prev_data = prev_products.get(company)
         
         # Calculate changes
         size_change = 0
@@ -479,22 +1696,57 @@ def run_game_theory_analysis(year):
             "recommendation": recommendations[company]
         }
     
+    return company_data
+
+# Game theory analysis document for one year, built by the pure kernel from
+# the year's documents plus the previous year's products by company
+def build_game_theory_analysis(year, company_docs, market_data, consumer_data, economic_data, prev_products,
+                               mixed_time_budget=MIXED_NASH_TIME_BUDGET):
+    snapshot = {
+        "products": company_docs,
+        "market": market_data,
+        "consumer": consumer_data,
+        "economic": economic_data,
+        "prev_products": prev_products
+    }
+    game = solve_game(snapshot, PAYOFF_MODEL, mixed_time_budget)
+    if not game:
+        return None
+    
     # Generate insights based on the analysis
-    insights = generate_insights(company_data, market_data, consumer_data, economic_data, nash_equilibria)
+    insights = generate_insights(game["company_data"], market_data, consumer_data, economic_data, game["nash_equilibrium"])
     
-    # Save analysis results to database
-    analysis_result = {
+    return {
         "year": year,
         "timestamp": datetime.now(),
-        "nash_equilibrium": nash_equilibria,
-        "payoff_matrix": payoff_matrix,
-        "company_data": company_data,
+        "companies": game["companies"],
+        "nash_equilibrium": game["nash_equilibrium"],
+        "mixed_nash_equilibria": game["mixed_nash_equilibria"],
+        "mixed_nash_search": game["mixed_nash_search"],
+        "correlated_equilibrium": game["correlated_equilibrium"],
+        "dominance_elimination": game["dominance_elimination"],
+        "payoff_matrix": game["payoff_matrix"],
+        "company_data": game["company_data"],
         "market_data": market_data,
         "consumer_data": consumer_data,
         "economic_data": economic_data,
         "insights": insights,
-        "full_payoffs": payoffs
+        "full_payoffs": game["full_payoffs"]
     }
+
+def run_game_theory_analysis(year, mixed_time_budget=MIXED_NASH_TIME_BUDGET):
+    # Get data for the specified year
+    company_docs = load_year_products(year)
+    market_data = market_collection.find_one({"year": year})
+    consumer_data = consumer_collection.find_one({"year": year})
+    economic_data = economic_collection.find_one({"year": year})
+    prev_products = {doc["company"]: doc for doc in load_year_products(year - 1)}
+    
+    analysis_result = build_game_theory_analysis(
+        year, company_docs, market_data, consumer_data, economic_data, prev_products, mixed_time_budget
+    )
+    if not analysis_result:
+        return None
     
     # Update or insert analysis
     analysis_collection.update_one(
@@ -502,9 +1754,62 @@ def run_game_theory_analysis(year):
         {"$set": analysis_result},
         upsert=True
     )
+    invalidate_analysis_cache([year])
     
     return analysis_result
 
+# Group product documents by year, one document per company in insertion order
+def group_products_by_year(products):
+    products_by_year = {}
+    for product in products:
+        products_by_year.setdefault(product["year"], {}).setdefault(product["company"], product)
+    return {year: list(company_docs.values()) for year, company_docs in products_by_year.items()}
+
+def first_doc_by_year(docs):
+    docs_by_year = {}
+    for doc in docs:
+        docs_by_year.setdefault(doc["year"], doc)
+    return docs_by_year
+
+# Analyse many years at once: one read per collection, every year computed in
+# memory, and all results written back with a single bulk upsert. Analyses
+# every year with products when years is None.
+def run_batch_analysis(years=None, mixed_time_budget=MIXED_NASH_TIME_BUDGET):
+    if years is None:
+        year_query = {}
+        product_query = {}
+    else:
+        years = sorted(set(years))
+        year_query = {"year": {"$in": years}}
+        # Include the previous years for the size and price changes
+        product_query = {"year": {"$in": sorted(set(years) | {year - 1 for year in years})}}
+    
+    products_by_year = group_products_by_year(products_collection.find(product_query).sort("_id", 1))
+    market_by_year = first_doc_by_year(market_collection.find(year_query))
+    consumer_by_year = first_doc_by_year(consumer_collection.find(year_query))
+    economic_by_year = first_doc_by_year(economic_collection.find(year_query))
+    
+    if years is None:
+        years = sorted(products_by_year)
+    
+    results = []
+    operations = []
+    for year in years:
+        prev_products = {doc["company"]: doc for doc in products_by_year.get(year - 1, [])}
+        analysis_result = build_game_theory_analysis(
+            year, products_by_year.get(year, []), market_by_year.get(year), consumer_by_year.get(year),
+            economic_by_year.get(year), prev_products, mixed_time_budget
+        )
+        if analysis_result:
+            results.append(analysis_result)
+            operations.append(pymongo.UpdateOne({"year": year}, {"$set": analysis_result}, upsert=True))
+    
+    if operations:
+        analysis_collection.bulk_write(operations, ordered=False)
+        invalidate_analysis_cache([result["year"] for result in results])
+    
+    return results
+
 def generate_insights(company_data, market_data, consumer_data, economic_data, nash_equilibria):
     insights = []
     
@@ -521,8 +1826,9 @@ def generate_insights(company_data, market_data, consumer_data, economic_data, n
         insights.append("Strong consumer confidence ({}) suggests consumers may be less sensitive to package size changes.".format(economic_data["consumer_confidence_index"]))
     
     # Insight 3: Brand loyalty impact
-    max_loyalty = max(consumer_data["milk_bikis_brand_loyalty"], consumer_data["good_day_brand_loyalty"], consumer_data["parle_g_brand_loyalty"])
-    min_loyalty = min(consumer_data["milk_bikis_brand_loyalty"], consumer_data["good_day_brand_loyalty"], consumer_data["parle_g_brand_loyalty"])
+    loyalty_scores = [company_brand_loyalty(company, consumer_data) * 10 for company in company_data]
+    max_loyalty = max(loyalty_scores)
+    min_loyalty = min(loyalty_scores)
     
     if max_loyalty - min_loyalty > 1.5:
         insights.append("Significant differences in brand loyalty between companies suggest different optimal strategies for each company.")
@@ -538,11 +1844,7 @@ def generate_insights(company_data, market_data, consumer_data, economic_data, n
         insights.append("High raw material costs are putting pressure on profit margins, making shrinkflation an attractive strategy to maintain profitability.")
     
     # Insight 6: Price/size ratio comparison
-    price_per_unit = {
-        "Milk Bikis": company_data["Milk Bikis"]["pricePerUnit"],
-        "Good Day": company_data["Good Day"]["pricePerUnit"],
-        "Parle G": company_data["Parle G"]["pricePerUnit"]
-    }
+    price_per_unit = {company: data["pricePerUnit"] for company, data in company_data.items()}
     
     max_price = max(price_per_unit.values())
     min_price = min(price_per_unit.values())
@@ -606,53 +1908,98 @@ def get_years():
         # Return fallback years if there's an error
         return jsonify([2018, 2019, 2020, 2021, 2022, 2023, 2024, 2025])
 
+@app.route('/api/indexes')
+def get_index_report():
+    return jsonify(verify_indexes())
+
 @app.route('/api/analysis/<int:year>')
 def get_analysis(year):
-    analysis = analysis_collection.find_one({"year": year})
+    # Serve the cached JSON when the analysis has not changed since
+    payload = load_serialized_analysis(year)
+    if payload is not None:
+        return payload
+    
+    # Run analysis if it doesn't exist
+    analysis = run_game_theory_analysis(year)
     if not analysis:
-        # Run analysis if it doesn't exist
-        analysis = run_game_theory_analysis(year)
-        if not analysis:
-            return jsonify({"error": "No data available for the specified year"}), 404
+        return jsonify({"error": "No data available for the specified year"}), 404
     
     # Convert MongoDB document to JSON
     return json_util.dumps(analysis)
 
-@app.route('/api/historical-data/<data_type>')
-def get_historical_data(data_type):
-    if data_type not in ["size", "price", "ratio", "market_share", "profit_margin"]:
-        return jsonify({"error": "Invalid data type"}), 400
-    
-    # Get all years
-    years = sorted(products_collection.distinct("year"))
-    
-    # Get data for each company and year
-    result = []
+@app.route('/api/analysis-cache')
+def get_analysis_cache_stats():
+    with analysis_cache_lock:
+        return jsonify(dict(analysis_cache_stats, size=len(analysis_cache), max_size=ANALYSIS_CACHE_SIZE))
+
+@app.route('/api/simulation-cache')
+def get_simulation_cache_stats():
+    with simulation_cache_lock:
+        return jsonify(dict(simulation_cache_stats, size=len(simulation_cache), max_size=SIMULATION_CACHE_SIZE, mongo=SIMULATION_CACHE_MONGO))
+
+HISTORICAL_DATA_TYPES = ["size", "price", "ratio", "market_share", "profit_margin"]
+
+def historical_value(product, data_type):
+    if data_type == "size":
+        return product["size"]
+    elif data_type == "price":
+        return product["price"]
+    elif data_type == "ratio":
+        # Price per unit (ml or g)
+        return round(product["price"] / product["size"] * 100, 2)  # Price per 100 ml/g
+    elif data_type == "market_share":
+        return product["market_share"]
+    elif data_type == "profit_margin":
+        # Calculate profit margin
+        production_cost = product.get("production_cost", product["price"] * 0.5)
+        profit_margin = ((product["price"] - production_cost) / product["price"]) * 100
+        return round(profit_margin, 1)
+
+# All requested series for every company and year from a single projected
+# cursor: {data_type: [{"year": "2018", company: value, ...}, ...]}
+def historical_series(data_types, start_year=None, end_year=None):
+    query = {}
+    if start_year is not None or end_year is not None:
+        query["year"] = {}
+        if start_year is not None:
+            query["year"]["$gte"] = start_year
+        if end_year is not None:
+            query["year"]["$lte"] = end_year
     
-    for year in years:
-        data_point = {"year": str(year)}
-        
-        for company in ["Milk Bikis", "Good Day", "Parle G"]:
-            product = products_collection.find_one({"company": company, "year": year})
-            
-            if product:
-                if data_type == "size":
-                    data_point[company] = product["size"]
-                elif data_type == "price":
-                    data_point[company] = product["price"]
-                elif data_type == "ratio":
-                    # Price per unit (ml or g)
-                    data_point[company] = round(product["price"] / product["size"] * 100, 2)  # Price per 100 ml/g
-                elif data_type == "market_share":
-                    data_point[company] = product["market_share"]
-                elif data_type == "profit_margin":
-                    # Calculate profit margin
-                    profit_margin = ((product["price"] - product["production_cost"]) / product["price"]) * 100
-                    data_point[company] = round(profit_margin, 1)
-        
-        result.append(data_point)
+    projection = {"_id": 0, "year": 1, "company": 1, "size": 1, "price": 1, "market_share": 1, "production_cost": 1}
+    products = products_collection.find(query, projection).sort([("year", 1), ("_id", 1)])
     
-    return jsonify(result)
+    result = {data_type: [] for data_type in data_types}
+    for year, company_docs in group_products_by_year(products).items():
+        for data_type in data_types:
+            data_point = {"year": str(year)}
+            for product in company_docs:
+                data_point[product["company"]] = historical_value(product, data_type)
+            result[data_type].append(data_point)
+    
+    return result
+
+def year_range_args():
+    return request.args.get('start_year', type=int), request.args.get('end_year', type=int)
+
+@app.route('/api/historical-data')
+def get_all_historical_data():
+    data_types = request.args.get('types', ",".join(HISTORICAL_DATA_TYPES)).split(",")
+    data_types = [data_type.strip() for data_type in data_types if data_type.strip()]
+    invalid = [data_type for data_type in data_types if data_type not in HISTORICAL_DATA_TYPES]
+    if invalid or not data_types:
+        return jsonify({"error": "Invalid data type"}), 400
+    
+    start_year, end_year = year_range_args()
+    return jsonify(historical_series(data_types, start_year, end_year))
+
+@app.route('/api/historical-data/<data_type>')
+def get_historical_data(data_type):
+    if data_type not in HISTORICAL_DATA_TYPES:
+        return jsonify({"error": "Invalid data type"}), 400
+    
+    start_year, end_year = year_range_args()
+    return jsonify(historical_series([data_type], start_year, end_year)[data_type])
 
 @app.route('/api/market-data')
 def get_market_data():
@@ -705,6 +2052,14 @@ def get_economic_data():
     
     return jsonify(result)
 
+@app.route('/api/run-analysis', methods=['POST'])
+def trigger_batch_analysis():
+    results = run_batch_analysis()
+    if not results:
+        return jsonify({"error": "Failed to run analysis"}), 500
+    
+    return jsonify({"years": [result["year"] for result in results]})
+
 @app.route('/api/run-analysis/<int:year>', methods=['POST'])
 def trigger_analysis(year):
     result = run_game_theory_analysis(year)
@@ -713,302 +2068,1958 @@ def trigger_analysis(year):
     
     return json_util.dumps(result)
 
+@app.route('/api/strategy-grid/<int:year>', methods=['POST'])
+def strategy_grid_analysis(year):
+    spec = request.get_json(silent=True) or {}
+    
+    company_docs = load_year_products(year)
+    consumer_data = consumer_collection.find_one({"year": year})
+    economic_data = economic_collection.find_one({"year": year})
+    if len(company_docs) < 2 or not all([consumer_data, economic_data]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    
+    companies = [doc["company"] for doc in company_docs]
+    try:
+        grids = parse_strategy_grids(spec, companies)
+        time_budget = min(float(spec.get("time_budget", GRID_SEARCH_TIME_BUDGET)), GRID_SEARCH_TIME_BUDGET)
+        result = solve_strategy_grid(payoff_inputs(company_docs, consumer_data, economic_data), grids, time_budget=time_budget)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    labels = [[grid_strategy_label(shrink, price_change) for shrink, price_change in grid] for grid in grids]
+    equilibria = []
+    for profile, payoffs in result["equilibria"]:
+        equilibria.append({
+            company: {
+                "strategy": labels[i][profile[i]],
+                "shrink": round(float(grids[i][profile[i], 0]) * 100, 2),
+                "priceChange": round(float(grids[i][profile[i], 1]) * 100, 2),
+                "payoff": float(payoffs[i])
+            }
+            for i, company in enumerate(companies)
+        })
+    
+    return jsonify({
+        "year": year,
+        "companies": companies,
+        "strategies": {company: labels[i] for i, company in enumerate(companies)},
+        "dominance_elimination": {
+            "strategies": {company: [labels[i][s] for s in result["available"][i]] for i, company in enumerate(companies)},
+            "eliminated": [
+                {"round": round_number, "company": companies[i], "strategy": labels[i][s]}
+                for round_number, i, s in result["eliminated"]
+            ],
+            "original_profiles": result["original_profiles"],
+            "profiles": result["reduced_profiles"]
+        },
+        "nash_equilibria": equilibria,
+        "search": {
+            "profiles_scanned": result["profiles_scanned"],
+            "complete": result["complete"],
+            "elapsed": result["elapsed"]
+        }
+    })
+
+# Sequential-move (Stackelberg) games for the given years, or every year.
+# Uses the maintain/shrink game unless the request gives a strategy grid.
+@app.route('/api/stackelberg', methods=['POST'])
+def stackelberg_analysis():
+    spec = request.get_json(silent=True) or {}
+    
+    years = spec.get("years")
+    if years is not None and (not isinstance(years, list) or not all(isinstance(year, int) for year in years)):
+        return jsonify({"error": "Years must be a list of integers"}), 400
+    year_query = {"year": {"$in": years}} if years is not None else {}
+    products_by_year = group_products_by_year(products_collection.find(year_query).sort("_id", 1))
+    consumer_by_year = first_doc_by_year(consumer_collection.find(year_query))
+    economic_by_year = first_doc_by_year(economic_collection.find(year_query))
+    
+    results = []
+    try:
+        time_budget = min(float(spec.get("time_budget", GRID_SEARCH_TIME_BUDGET)), GRID_SEARCH_TIME_BUDGET)
+        use_grid = any(key in spec for key in ["shrink_levels", "price_changes", "companies"])
+        for year in sorted(products_by_year):
+            company_docs = products_by_year[year]
+            consumer_data = consumer_by_year.get(year)
+            economic_data = economic_by_year.get(year)
+            if len(company_docs) < 2 or not all([consumer_data, economic_data]):
+                continue
+            
+            companies = [doc["company"] for doc in company_docs]
+            grids = parse_strategy_grids(spec, companies) if use_grid else binary_strategy_grids(len(companies))
+            order = parse_move_order(spec.get("order"), companies, default_move_order(company_docs))
+            inputs = payoff_inputs(company_docs, consumer_data, economic_data)
+            results.append(stackelberg_summary(year, inputs, grids, order, time_budget))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if not results:
+        return jsonify({"error": "No data available for the specified years"}), 404
+    return jsonify(results)
+
+@app.route('/api/phase-diagram/<int:year>', methods=['POST'])
+def phase_diagram(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    company_docs = base["products"]
+    if len(company_docs) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(company_docs) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Phase diagrams support up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    try:
+        x_parameter, x_values = phase_diagram_axis(spec.get("x", {}), "shrinkflation_awareness")
+        y_parameter, y_values = phase_diagram_axis(spec.get("y", {}), "production_cost_change")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if x_parameter == y_parameter:
+        return jsonify({"error": "Phase diagram axes need two different parameters"}), 400
+    
+    # The analysis payoff model by default, or the simulation one
+    model = SIMULATION_PAYOFF_MODEL if spec.get("model") == "simulation" else PAYOFF_MODEL
+    inputs = payoff_inputs(company_docs, base["consumer"], base["economic"])
+    labels, region_profiles = compute_phase_diagram(inputs, x_parameter, x_values, y_parameter, y_values, model)
+    
+    companies = inputs["companies"]
+    region_equilibria = [[format_profile(companies, profile) for profile in profiles] for profiles in region_profiles]
+    cell_counts = np.bincount(labels.ravel(), minlength=len(region_profiles))
+    
+    result = {
+        "year": year,
+        "companies": companies,
+        "x": {"parameter": x_parameter, "values": x_values.tolist()},
+        "y": {"parameter": y_parameter, "values": y_values.tolist()},
+        "regions": [
+            {"id": region, "nash_equilibrium": equilibria, "cells": int(cell_counts[region])}
+            for region, equilibria in enumerate(region_equilibria)
+        ],
+        "cells": labels.tolist()
+    }
+    
+    if spec.get("image"):
+        region_names = ["; ".join(equilibria) or "No pure equilibrium" for equilibria in region_equilibria]
+        result["image"] = phase_diagram_image(labels, region_names, x_parameter, x_values, y_parameter, y_values)
+    
+    return jsonify(result)
+
+@app.route('/api/monte-carlo/<int:year>', methods=['POST'])
+def monte_carlo_analysis(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    company_docs = base["products"]
+    if len(company_docs) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(company_docs) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Monte Carlo analysis supports up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    try:
+        samples = int(spec.get("samples", MONTE_CARLO_DEFAULT_SAMPLES))
+        if samples < 1 or samples > MONTE_CARLO_MAX_SAMPLES:
+            raise ValueError(f"Monte Carlo analysis takes 1 to {MONTE_CARLO_MAX_SAMPLES} samples")
+        # Without a seed, draw one and report it so the run can be repeated
+        seed = int(spec["seed"]) if spec.get("seed") is not None else int(np.random.SeedSequence().entropy)
+        if seed < 0:
+            raise ValueError("Monte Carlo seed must not be negative")
+        distributions = parse_monte_carlo_distributions(spec.get("distributions", {}))
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    start_time = time.perf_counter()
+    inputs = payoff_inputs(company_docs, base["consumer"], base["economic"])
+    result = monte_carlo_game(inputs, samples, seed, distributions)
+    
+    # Baseline recommendation from the undisturbed inputs
+    companies = inputs["companies"]
+    n_players = len(companies)
+    baseline = recommended_profiles(payoff_table_from_inputs(inputs)[np.newaxis])[1][0]
+    profiles = [tuple(int(s) for s in np.unravel_index(index, (2,) * n_players)) for index in range(2 ** n_players)]
+    shrink_counts = np.array(profiles).T @ result["recommendation_counts"]
+    
+    return jsonify({
+        "year": year,
+        "companies": companies,
+        "samples": samples,
+        "seed": seed,
+        "distributions": distributions,
+        "no_pure_equilibrium": result["no_equilibrium"] / samples,
+        "equilibrium_frequencies": [
+            {"nash_equilibrium": format_profile(companies, profiles[index]), "frequency": float(result["equilibrium_counts"][index] / samples)}
+            for index in np.argsort(-result["equilibrium_counts"], kind="stable") if result["equilibrium_counts"][index]
+        ],
+        "recommendations": {
+            company: {
+                "baseline": STRATEGIES[profiles[baseline][i]],
+                "shrink": float(shrink_counts[i] / samples),
+                "maintain": float((samples - shrink_counts[i]) / samples),
+                # Share of draws recommending the baseline strategy
+                "stability": float((shrink_counts[i] if profiles[baseline][i] else samples - shrink_counts[i]) / samples)
+            }
+            for i, company in enumerate(companies)
+        },
+        "payoff_quantiles": {
+            company: dict(zip([f"{round(q * 100)}%" for q in MONTE_CARLO_QUANTILES], payoff_count_quantiles(result["payoff_counts"][i], MONTE_CARLO_QUANTILES)))
+            for i, company in enumerate(companies)
+        },
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    })
+
+@app.route('/api/simulation-jobs', methods=['POST'])
+def submit_simulation_job():
+    data = request.get_json(silent=True)
+    
+    if not data or 'year' not in data or ('scenarios' not in data and 'grid' not in data):
+        return jsonify({"error": "Invalid simulation data"}), 400
+    
+    year = data['year']
+    try:
+        scenarios, total = simulation_request_scenarios(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if not analysis_collection.find_one({"year": year}, {"_id": 1}):
+        return jsonify({"error": "No analysis data available for the specified year"}), 404
+    
+    job = create_simulation_job(year, total)
+    if job is None:
+        return jsonify({"error": "Too many simulation jobs are running, try again later"}), 429, {"Retry-After": "30"}
+    
+    start_simulation_job(job, load_simulation_base(year), scenarios)
+    
+    return jsonify({
+        "job_id": job["job_id"],
+        "status_url": url_for("simulation_job_status", job_id=job["job_id"]),
+        "events_url": url_for("simulation_job_events", job_id=job["job_id"]),
+        "results_url": url_for("simulation_job_results", job_id=job["job_id"])
+    }), 202
+
+@app.route('/api/simulation-jobs/<job_id>', methods=['GET'])
+def simulation_job_status(job_id):
+    job = load_simulation_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown simulation job"}), 404
+    return jsonify(job)
+
+@app.route('/api/simulation-jobs/<job_id>', methods=['DELETE'])
+def cancel_simulation_job(job_id):
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        if job is not None and job["status"] in ("queued", "running"):
+            job["cancel"].set()
+    
+    state = load_simulation_job(job_id)
+    if state is None:
+        return jsonify({"error": "Unknown simulation job"}), 404
+    if state["status"] in ("queued", "running"):
+        state["status"] = "cancelling"
+    return jsonify(state), 202
+
+@app.route('/api/simulation-jobs/<job_id>/events')
+def simulation_job_events(job_id):
+    if load_simulation_job(job_id) is None:
+        return jsonify({"error": "Unknown simulation job"}), 404
+    return Response(stream_simulation_job_events(job_id), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/api/simulation-jobs/<job_id>/results')
+def simulation_job_results(job_id):
+    job = load_simulation_job(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown simulation job"}), 404
+    
+    # Stored batches in scenario order; partial while the job runs
+    simulations = []
+    for batch in simulation_job_results_collection.find({"job_id": job_id}, {"_id": 0, "simulations": 1}).sort("batch", 1):
+        simulations += batch["simulations"]
+    
+    return json.dumps({"job": job, "simulations": simulations}), 200, {"Content-Type": "application/json"}
+
+@app.route('/api/sensitivity/<int:year>')
+def sensitivity(year):
+    base = load_simulation_base(year)
+    if len(base["products"]) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(base["products"]) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Sensitivity analysis supports up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    # Serve the stored analysis while the year's inputs are unchanged
+    key = sensitivity_key(year, base)
+    cached = sensitivity_collection.find_one({"year": year}, {"_id": 0})
+    if cached and cached["key"] == key and request.args.get("refresh") != "1":
+        return jsonify(dict(cached["result"], year=year, computed_at=cached["computed_at"].isoformat()))
+    
+    # MongoDB keeps milliseconds, so the stored and returned times agree
+    computed_at = datetime.now()
+    computed_at = computed_at.replace(microsecond=computed_at.microsecond // 1000 * 1000)
+    result = sensitivity_analysis(payoff_inputs(base["products"], base["consumer"], base["economic"]))
+    sensitivity_collection.replace_one(
+        {"year": year}, {"year": year, "key": key, "computed_at": computed_at, "result": result}, upsert=True
+    )
+    return jsonify(dict(result, year=year, computed_at=computed_at.isoformat()))
+
+# Logit QRE paths of every year (or ?years=2020,2021), traced in one batch
+# per company count. Stored per year while the year's payoff table is unchanged.
+@app.route('/api/qre')
+def quantal_response_equilibria():
+    try:
+        years = [int(year) for year in request.args["years"].split(",")] if request.args.get("years") else None
+    except ValueError:
+        return jsonify({"error": "Years must be a comma-separated list of integers"}), 400
+    year_query = {"year": {"$in": years}} if years is not None else {}
+    products_by_year = group_products_by_year(products_collection.find(year_query).sort("_id", 1))
+    consumer_by_year = first_doc_by_year(consumer_collection.find(year_query))
+    economic_by_year = first_doc_by_year(economic_collection.find(year_query))
+    cached = {doc["year"]: doc for doc in qre_collection.find(year_query, {"_id": 0})}
+    refresh = request.args.get("refresh") == "1"
+    
+    results = {}
+    pending = {}
+    for year in sorted(products_by_year):
+        company_docs = products_by_year[year]
+        if len(company_docs) < 2 or not all([consumer_by_year.get(year), economic_by_year.get(year)]):
+            continue
+        payoff_table = compute_payoff_table(company_docs, consumer_by_year[year], economic_by_year[year])
+        key = qre_key(year, payoff_table)
+        if not refresh and year in cached and cached[year]["key"] == key:
+            results[year] = cached[year]["result"]
+        else:
+            pending.setdefault(len(company_docs), []).append((year, [doc["company"] for doc in company_docs], payoff_table, key))
+    
+    # Trace the missing years together, one batch per company count
+    operations = []
+    for games in pending.values():
+        paths = trace_logit_qre(np.stack([payoff_table for _, _, payoff_table, _ in games]))
+        for (year, companies, payoff_table, key), path in zip(games, paths):
+            results[year] = qre_summary(payoff_table, companies, path)
+            operations.append(pymongo.ReplaceOne({"year": year}, {"year": year, "key": key, "result": results[year]}, upsert=True))
+    if operations:
+        qre_collection.bulk_write(operations, ordered=False)
+    
+    if not results:
+        return jsonify({"error": "No data available for the specified years"}), 404
+    return jsonify([dict(results[year], year=year) for year in sorted(results)])
+
+@app.route('/api/rolling-simulation/<int:year>', methods=['POST'])
+def rolling_simulation_analysis(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    if len(base["products"]) < 2 or not all([base["market"], base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(base["products"]) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Rolling simulations support up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    try:
+        periods = int(spec.get("periods", ROLLING_DEFAULT_PERIODS))
+        paths = int(spec.get("paths", ROLLING_DEFAULT_PATHS))
+        if not 1 <= periods <= ROLLING_MAX_PERIODS or not 1 <= paths <= ROLLING_MAX_PATHS:
+            raise ValueError(f"Rolling simulations take 1 to {ROLLING_MAX_PERIODS} periods and 1 to {ROLLING_MAX_PATHS} paths")
+        seed = int(spec.get("seed", 0))
+        if seed < 0:
+            raise ValueError("Rolling simulation seed must not be negative")
+        dynamics = parse_rolling_dynamics(spec.get("dynamics", {}))
+        scenario = spec.get("scenario", {})
+        if not isinstance(scenario, dict):
+            raise ValueError("Scenario must be a scenario object")
+        
+        normalize_scenario(scenario)
+        
+        # The first period starts from the year's data with the scenario applied
+        start_time = time.perf_counter()
+        scenario_inputs = scenario_payoff_inputs(base["products"], base["consumer"], base["economic"], [scenario])
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    inputs = {key: value if key == "companies" else value[0] for key, value in scenario_inputs.items()}
+    timeline = rolling_simulation(inputs, inputs["size"], periods, paths, seed, dynamics)
+    
+    return jsonify({
+        "year": year,
+        "companies": inputs["companies"],
+        "periods": periods,
+        "paths": paths,
+        "seed": seed,
+        "dynamics": dynamics,
+        "timeline": timeline,
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    })
+
+@app.route('/api/agent-market/<int:year>', methods=['POST'])
+def agent_market(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    company_docs = base["products"]
+    if len(company_docs) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(company_docs) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Agent markets support up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    try:
+        count = int(spec.get("agents", AGENT_DEFAULT_COUNT))
+        periods = int(spec.get("periods", AGENT_DEFAULT_PERIODS))
+        if not 1 <= count <= AGENT_MAX_COUNT or not 0 <= periods <= AGENT_MAX_PERIODS:
+            raise ValueError(f"Agent markets take 1 to {AGENT_MAX_COUNT} agents and 0 to {AGENT_MAX_PERIODS} periods")
+        seed = int(spec.get("seed", 0))
+        if seed < 0:
+            raise ValueError("Agent market seed must not be negative")
+        params = dict(AGENT_MARKET_MODEL)
+        for name, value in spec.get("params", {}).items():
+            if name not in params:
+                raise ValueError(f"Unknown agent market parameter: {name}")
+            params[name] = float(value)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    start_time = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    companies = [doc["company"] for doc in company_docs]
+    prices = np.array([doc["price"] for doc in company_docs], dtype=float)
+    sizes = np.array([doc["size"] for doc in company_docs], dtype=float)
+    population = create_agent_population(company_docs, base["consumer"], count, rng, params)
+    
+    # Agent shares replace the rule-based share adjustments in the game
+    profiles, shares = agent_profile_shares(population, prices, sizes, params)
+    inputs = payoff_inputs(company_docs, base["consumer"], base["economic"])
+    payoff_table = payoff_table_from_inputs(inputs, share_change=agent_share_change_table(profiles, shares))
+    available, dominance_elimination = reduce_game(payoff_table, companies)
+    equilibrium_profiles = find_pure_nash_profiles(payoff_table, available)
+    _, recommended, _ = recommended_profiles(payoff_table[np.newaxis])
+    recommended_profile = profiles[recommended[0]]
+    
+    # Let the market run under the recommended profile
+    period_shares = []
+    for period in range(1, periods + 1):
+        realized = agent_market_period(population, prices, sizes, recommended_profile, rng, params)
+        period_shares.append({"period": period, "shares": dict(zip(companies, np.round(realized, 3).tolist()))})
+    
+    return jsonify({
+        "year": year,
+        "companies": companies,
+        "agents": count,
+        "seed": seed,
+        "params": params,
+        "profile_shares": [
+            {"profile": format_profile(companies, profile.astype(int)), "shares": dict(zip(companies, np.round(profile_shares, 3).tolist()))}
+            for profile, profile_shares in zip(profiles, shares)
+        ],
+        "payoffs": payoff_table_to_dict(payoff_table, companies),
+        "dominance_elimination": dominance_elimination,
+        "nash_equilibrium": [format_profile(companies, profile) for profile in equilibrium_profiles],
+        "recommendations": {company: STRATEGIES[int(s)] for company, s in zip(companies, recommended_profile)},
+        "periods": period_shares,
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    })
+
+@app.route('/api/evolutionary/<int:year>', methods=['POST'])
+def evolutionary_analysis(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    company_docs = base["products"]
+    if len(company_docs) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(company_docs) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Evolutionary dynamics support up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    n_players = len(company_docs)
+    try:
+        dynamics = spec.get("dynamics", "replicator")
+        if dynamics not in EVOLUTIONARY_DYNAMICS:
+            raise ValueError(f"Unknown dynamics: {dynamics}")
+        horizon = float(spec.get("horizon", EVOLUTIONARY_DEFAULT_HORIZON))
+        if not 0 < horizon <= EVOLUTIONARY_MAX_HORIZON:
+            raise ValueError(f"Evolutionary horizon must be above 0 and at most {EVOLUTIONARY_MAX_HORIZON}")
+        rationality = float(spec.get("rationality", EVOLUTIONARY_DEFAULT_RATIONALITY))
+        if rationality < 0:
+            raise ValueError("Rationality must not be negative")
+        n_trajectories = int(spec.get("trajectories", EVOLUTIONARY_DEFAULT_TRAJECTORIES))
+        if not 0 <= n_trajectories <= EVOLUTIONARY_MAX_TRAJECTORIES:
+            raise ValueError(f"Evolutionary dynamics return 0 to {EVOLUTIONARY_MAX_TRAJECTORIES} trajectories")
+        seed = int(spec.get("seed", 0))
+        if seed < 0:
+            raise ValueError("Evolutionary seed must not be negative")
+        
+        # Explicit starting shrink shares, one per company, or random ones
+        initial = None
+        if spec.get("initial") is not None:
+            initial = np.array(spec["initial"], dtype=float)
+            if initial.ndim != 2 or initial.shape[1] != n_players or not np.all((initial >= 0) & (initial <= 1)):
+                raise ValueError(f"Initial states must be lists of {n_players} shrink shares between 0 and 1")
+        samples = len(initial) if initial is not None else int(spec.get("samples", EVOLUTIONARY_DEFAULT_SAMPLES))
+        if not 1 <= samples <= EVOLUTIONARY_MAX_SAMPLES:
+            raise ValueError(f"Evolutionary dynamics take 1 to {EVOLUTIONARY_MAX_SAMPLES} initial states")
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    start_time = time.perf_counter()
+    inputs = payoff_inputs(company_docs, base["consumer"], base["economic"])
+    companies = inputs["companies"]
+    payoff_table = payoff_table_from_inputs(inputs)
+    try:
+        result = evolutionary_game(payoff_table, companies, samples, seed, horizon, dynamics, rationality, n_trajectories, initial)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 500
+    
+    return jsonify({
+        "year": year,
+        "companies": companies,
+        "dynamics": dynamics,
+        "rationality": rationality if dynamics == "logit" else None,
+        "horizon": horizon,
+        "samples": samples,
+        "seed": seed,
+        **result,
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    })
+
+@app.route('/api/bayesian-game/<int:year>', methods=['POST'])
+def bayesian_game(year):
+    spec = request.get_json(silent=True) or {}
+    
+    base = load_simulation_base(year)
+    company_docs = base["products"]
+    if len(company_docs) < 2 or not all([base["consumer"], base["economic"]]):
+        return jsonify({"error": "No data available for the specified year"}), 404
+    if len(company_docs) > MAX_FULL_PAYOFF_PLAYERS:
+        return jsonify({"error": f"Bayesian games support up to {MAX_FULL_PAYOFF_PLAYERS} companies"}), 400
+    
+    inputs = payoff_inputs(company_docs, base["consumer"], base["economic"])
+    try:
+        settings = parse_bayesian_settings(spec.get("settings", {}))
+        time_budget = min(float(spec.get("time_budget", BAYESIAN_SEARCH_TIME_BUDGET)), BAYESIAN_SEARCH_TIME_BUDGET)
+        types = bayesian_types(inputs, settings)
+        result = solve_bayesian_game(bayesian_payoff_tables(inputs, types), types, time_budget)
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    companies = inputs["companies"]
+    labels = bayesian_type_labels(inputs, types)
+    return jsonify({
+        "year": year,
+        "companies": companies,
+        "settings": settings,
+        "types": {
+            company: [{"type": label, "probability": round(float(p), 4)} for label, p in zip(labels[i], types["type_prior"])]
+            for i, company in enumerate(companies)
+        },
+        # Strategies are listed per type, in the order of "types"; None while
+        # dominance leaves both open
+        "dominance_elimination": {
+            company: [STRATEGIES[s] if s >= 0 else None for s in result["decided"][i]]
+            for i, company in enumerate(companies)
+        },
+        "bayes_nash_equilibria": [
+            {
+                company: {
+                    "strategies": [STRATEGIES[s] for s in shrink[i]],
+                    # Ex-ante expected payoff, before the firm learns its type
+                    "expected_payoff": round(float(payoffs[i] @ types["type_prior"]), 4)
+                }
+                for i, company in enumerate(companies)
+            }
+            for shrink, payoffs in result["equilibria"]
+        ],
+        "search": {
+            "type_profiles": result["type_profiles"],
+            "undecided_types": result["undecided"],
+            "profiles": result["profiles"],
+            "profiles_scanned": result["profiles_scanned"],
+            "complete": result["complete"],
+            "elapsed": result["elapsed"]
+        }
+    })
+
+# Tacit collusion sustainability of every year (or ?years=2020,2021), the
+# years with the same company count solved in one batch
+@app.route('/api/collusion')
+def collusion():
+    try:
+        years = [int(year) for year in request.args["years"].split(",")] if request.args.get("years") else None
+        samples = int(request.args.get("samples", COLLUSION_DEFAULT_SAMPLES))
+        if not 1 <= samples <= COLLUSION_MAX_SAMPLES:
+            raise ValueError(f"Collusion analysis takes 1 to {COLLUSION_MAX_SAMPLES} samples")
+        seed = int(request.args.get("seed", 0))
+        if seed < 0:
+            raise ValueError("Collusion seed must not be negative")
+        discount_factor = float(request.args.get("discount_factor", COLLUSION_DISCOUNT_FACTOR))
+        if not 0 < discount_factor < 1:
+            raise ValueError("Discount factor must be between 0 and 1")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    year_query = {"year": {"$in": years}} if years is not None else {}
+    products_by_year = group_products_by_year(products_collection.find(year_query).sort("_id", 1))
+    consumer_by_year = first_doc_by_year(consumer_collection.find(year_query))
+    economic_by_year = first_doc_by_year(economic_collection.find(year_query))
+    
+    groups = {}
+    for year in sorted(products_by_year):
+        company_docs = products_by_year[year]
+        if len(company_docs) < 2 or not all([consumer_by_year.get(year), economic_by_year.get(year)]):
+            continue
+        inputs = payoff_inputs(company_docs, consumer_by_year[year], economic_by_year[year])
+        groups.setdefault(len(company_docs), []).append((year, inputs))
+    if not groups:
+        return jsonify({"error": "No data available for the specified years"}), 404
+    
+    start_time = time.perf_counter()
+    results = []
+    for year_inputs in groups.values():
+        results += collusion_analysis(year_inputs, samples, seed, discount_factor=discount_factor)
+    return jsonify({
+        "years": sorted(results, key=lambda result: result["year"]),
+        "elapsed": round(time.perf_counter() - start_time, 4)
+    })
+
 @app.route('/api/simulate', methods=['POST'])
 def simulate_scenario():
     data = request.json
     
-    if not data or 'year' not in data or 'scenarios' not in data:
+    if not data or 'year' not in data or ('scenarios' not in data and 'grid' not in data):
         return jsonify({"error": "Invalid simulation data"}), 400
     
     year = data['year']
-    scenarios = data['scenarios']
     
     # Get base data
-    base_analysis = analysis_collection.find_one({"year": year})
+    base_analysis = analysis_collection.find_one({"year": year}, {"_id": 1})
     if not base_analysis:
         return jsonify({"error": "No analysis data available for the specified year"}), 404
     
-    # Run simulations for each scenario
-    simulation_results = []
+    # Scenario grids are expanded on the server and streamed back
+    if 'grid' in data:
+        try:
+            axes = scenario_grid_axes(data['grid'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return Response(stream_scenario_grid(load_simulation_base(year), axes), mimetype="application/x-ndjson")
     
-    for scenario in scenarios:
-        # Apply scenario modifications to a copy of the data
-        modified_data = simulate_scenario_data(year, scenario)
-        
-        # Run analysis with modified data
-        result = run_simulation_analysis(year, modified_data)
-        
-        simulation_results.append({
-            "scenario": scenario,
-            "result": result
-        })
+    # Run all scenarios against one fetch of the year's data
+    try:
+        scenarios, _ = simulation_request_scenarios(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    results = run_batch_simulation(year, scenarios)
+    simulation_results = [{"scenario": scenario, "result": result} for scenario, result in zip(scenarios, results)]
     
-    return json_util.dumps({"simulations": simulation_results})
+    # Results are plain JSON types, so skip the BSON-aware encoder
+    return json.dumps({"simulations": simulation_results})
 
-def simulate_scenario_data(year, scenario):
-    # Get base data
-    products = list(products_collection.find({"year": year}))
-    market = market_collection.find_one({"year": year})
-    consumer = consumer_collection.find_one({"year": year})
-    economic = economic_collection.find_one({"year": year})
-    
-    # Create copies of the data
-    products_copy = [product.copy() for product in products]
-    market_copy = market.copy() if market else {}
-    consumer_copy = consumer.copy() if consumer else {}
-    economic_copy = economic.copy() if economic else {}
-    
-    # Apply scenario modifications
-    scenario_type = scenario.get("type", "")
-    
-    if scenario_type == "consumer_awareness":
-        # Modify consumer awareness
-        awareness_change = scenario.get("change", 0)
-        consumer_copy["shrinkflation_awareness"] = min(100, max(0, consumer_copy.get("shrinkflation_awareness", 0) + awareness_change))
-    
-    elif scenario_type == "economic_downturn":
-        # Simulate economic downturn
-        severity = scenario.get("severity", 1)
-        economic_copy["gdp_growth_rate"] = max(0, economic_copy.get("gdp_growth_rate", 0) - severity)
-        economic_copy["consumer_confidence_index"] = max(0, economic_copy.get("consumer_confidence_index", 0) - severity * 10)
-        market_copy["consumer_price_sensitivity"] = min(10, market_copy.get("consumer_price_sensitivity", 0) + severity)
-    
-    elif scenario_type == "raw_material_cost":
-        # Modify raw material costs
-        cost_change = scenario.get("change", 0)
-        market_copy["sugar_price_index"] = max(0, market_copy.get("sugar_price_index", 100) + cost_change * 1.5)  # Amplify effect
-        market_copy["wheat_price_index"] = max(0, market_copy.get("wheat_price_index", 100) + cost_change * 1.5)  # Amplify effect
-        market_copy["packaging_price_index"] = max(0, market_copy.get("packaging_price_index", 100) + cost_change * 1.5)  # Amplify effect
+# A scenario is a single modification, or a composite one listing several
+# modifications under "modifications" that are applied in order
+def scenario_modifications(scenario):
+    if isinstance(scenario.get("modifications"), list):
+        return [modification for modification in scenario["modifications"] if isinstance(modification, dict)]
+    return [scenario]
+
+def scenario_number(modification, field, default):
+    value = modification.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"Scenario {modification.get('type', '')} {field} must be a number")
+    return float(value)
+
+# Canonical form of a scenario for cache keys: its modifications with defaults
+# filled in and only the fields they read, so scenarios spelled differently
+# share a key. Unknown modifications are dropped. Zero changes are kept, since
+# they still fill in missing production costs that later steps scale. Raises
+# ValueError for non-numeric changes and severities.
+def normalize_scenario(scenario):
+    normalized = []
+    for modification in scenario_modifications(scenario):
+        scenario_type = modification.get("type", "")
+        if scenario_type in ("consumer_awareness", "raw_material_cost"):
+            normalized.append({"type": scenario_type, "change": scenario_number(modification, "change", 0)})
+        elif scenario_type == "economic_downturn":
+            normalized.append({"type": scenario_type, "severity": scenario_number(modification, "severity", 1)})
+        elif scenario_type == "competitor_strategy" and modification.get("company") and modification.get("strategy") in ["shrink", "maintain"]:
+            normalized.append({"type": scenario_type, "company": modification["company"], "strategy": modification["strategy"]})
+    return normalized
+
+# Payoff inputs for a batch of scenarios: the base inputs stacked once per
+# scenario, with each scenario's modifications applied as array updates. This
+# defines what every modification type does for the batch simulation and the
+# rolling simulation. Composite scenarios are applied one step at a time across
+# the batch. Only the fields the payoff model reads are carried, plus the
+# product sizes.
+def scenario_payoff_inputs(company_docs, consumer_data, economic_data, scenarios):
+    inputs = payoff_inputs(company_docs, consumer_data, economic_data)
+    n_scenarios = len(scenarios)
+    companies = np.array(inputs["companies"], dtype=object)
+    price = np.tile(inputs["price"], (n_scenarios, 1))
+    cost = np.tile(inputs["cost"], (n_scenarios, 1))
+    size = np.tile(np.array([doc["size"] for doc in company_docs], dtype=float), (n_scenarios, 1))
+    has_cost = np.tile(np.array(["production_cost" in doc for doc in company_docs]), (n_scenarios, 1))
+    awareness = np.full(n_scenarios, float(consumer_data["shrinkflation_awareness"]))
+    confidence = np.full(n_scenarios, float(economic_data["consumer_confidence_index"]))
+    
+    modifications = [scenario_modifications(scenario) for scenario in scenarios]
+    for step in range(max((len(steps) for steps in modifications), default=0)):
+        step_modifications = [steps[step] if step < len(steps) else {} for steps in modifications]
+        scenario_types = np.array([modification.get("type", "") for modification in step_modifications], dtype=object)
+        change = np.array([
+            modification.get("change", 0) if modification.get("type") in ("consumer_awareness", "raw_material_cost") else 0
+            for modification in step_modifications
+        ], dtype=float)
+        severity = np.array([
+            modification.get("severity", 1) if modification.get("type") == "economic_downturn" else 0
+            for modification in step_modifications
+        ], dtype=float)
+        competitor = np.array([
+            modification.get("company") or None
+            if modification.get("type") == "competitor_strategy" and modification.get("strategy") in ["shrink", "maintain"] else None
+            for modification in step_modifications
+        ], dtype=object)
+        competitor_shrinks = np.array([modification.get("strategy") == "shrink" for modification in step_modifications])
         
-        # Also adjust production costs based on raw material changes
-        for product in products_copy:
-            if "production_cost" in product:
-                # Increase or decrease production cost based on raw material cost change
-                adjustment = 1 + (cost_change / 100)
-                product["production_cost"] = product["production_cost"] * adjustment
-            else:
-                # Add production cost if missing
-                product["production_cost"] = product["price"] * 0.5
-    
-    elif scenario_type == "competitor_strategy":
-        # Modify a specific company's strategy
-        company = scenario.get("company", "")
-        strategy = scenario.get("strategy", "")
+        # Consumer awareness shifts, clipped to 0-100
+        awareness = np.where(scenario_types == "consumer_awareness", np.clip(awareness + change, 0, 100), awareness)
         
-        if company and strategy in ["shrink", "maintain"]:
-            for product in products_copy:
-                if product["company"] == company:
-                    if strategy == "shrink":
-                        product["size"] = product["size"] * 0.90  # Shrink by 10% instead of 5%
-                        # Also adjust production cost
-                        if "production_cost" in product:
-                            product["production_cost"] = product["production_cost"] * 0.94  # Production cost decreases by 6%
-                        else:
-                            product["production_cost"] = product["price"] * 0.47  # Lower than default 50%
-                    else:  # maintain
-                        # No size change, but ensure production_cost exists
-                        if "production_cost" not in product:
-                            product["production_cost"] = product["price"] * 0.5
+        # Economic downturn lowers consumer confidence
+        confidence = np.where(scenario_types == "economic_downturn", np.maximum(0, confidence - severity * 10), confidence)
+        
+        # Raw material costs scale the known production costs; missing ones
+        # are filled with the default of half the price they already hold
+        raw_material = (scenario_types == "raw_material_cost")[:, np.newaxis]
+        adjustment = np.where(scenario_types == "raw_material_cost", 1 + change / 100, 1.0)
+        cost = np.where(raw_material & has_cost, cost * adjustment[:, np.newaxis], cost)
+        has_cost = has_cost | raw_material
+        
+        # A competitor shrinking by 10% lowers its production cost; one that
+        # maintains gets the default production cost filled in
+        target = companies == competitor[:, np.newaxis]
+        shrink_target = target & competitor_shrinks[:, np.newaxis]
+        cost = np.where(shrink_target, np.where(has_cost, cost * 0.94, price * 0.47), cost)
+        size = np.where(shrink_target, size * 0.90, size)
+        has_cost = has_cost | target
     
     return {
-        "products": products_copy,
-        "market": market_copy,
-        "consumer": consumer_copy,
-        "economic": economic_copy
+        "companies": inputs["companies"],
+        "price": price,
+        "cost": cost,
+        "market_share": np.tile(inputs["market_share"], (n_scenarios, 1)),
+        "loyalty": np.tile(inputs["loyalty"], (n_scenarios, 1)),
+        "awareness": awareness / 100,
+        "confidence": confidence,
+        "size": size
+    }
+
+# The year's documents a simulation starts from, fetched once per request
+def load_simulation_base(year):
+    return {
+        "products": load_year_products(year),
+        "market": market_collection.find_one({"year": year}),
+        "consumer": consumer_collection.find_one({"year": year}),
+        "economic": economic_collection.find_one({"year": year})
     }
 
-def run_simulation_analysis(year, modified_data):
-    # Extract modified data
-    products = modified_data["products"]
-    market = modified_data["market"]
-    consumer = modified_data["consumer"]
-    economic = modified_data["economic"]
+# Solve a batch of scenarios against the same base data. The scenario games
+# are stacked and solved together.
+def simulate_scenarios(base, scenarios):
+    company_docs = base["products"]
+    consumer_data = base["consumer"]
+    economic_data = base["economic"]
     
-    # Get company data
-    milk_bikis_data = next((p for p in products if p["company"] == "Milk Bikis"), None)
-    good_day_data = next((p for p in products if p["company"] == "Good Day"), None)
-    parle_g_data = next((p for p in products if p["company"] == "Parle G"), None)
+    if not scenarios or len(company_docs) < 2 or not all([base["market"], consumer_data, economic_data]):
+        return [None] * len(scenarios)
     
-    if not all([milk_bikis_data, good_day_data, parle_g_data, market, consumer, economic]):
-        return None
+    companies = [doc["company"] for doc in company_docs]
+    inputs = scenario_payoff_inputs(company_docs, consumer_data, economic_data, scenarios)
+    payoff_tables = payoff_table_from_inputs(inputs, SIMULATION_PAYOFF_MODEL)
     
-    # Use the same game theory logic as in run_game_theory_analysis
-    # but with the modified data
-    # This is a simplified version for simulation
+    # Dominance and best-response checks for all scenarios at once. Strict
+    # elimination keeps every equilibrium, so the full-game masks agree with
+    # the kernel's reduced search.
+    reductions = reduce_games(payoff_tables, companies)
+    pure_profiles = [[] for _ in scenarios]
+    for index, *profile in np.argwhere(find_pure_nash_mask(payoff_tables)).tolist():
+        pure_profiles[index].append(tuple(profile))
     
-    # Define payoff calculation function based on multiple factors
-    def calculate_payoff(company_data, strategy, competitor1_data, competitor1_strategy, 
-                         competitor2_data, competitor2_strategy, market_data, consumer_data):
-        
-        # Base profit calculation
-        current_size = company_data["size"]
-        current_price = company_data["price"]
-        # Add a default value if production_cost is missing
-        production_cost = company_data.get("production_cost", current_price * 0.5)  # Default to 50% of price if missing
-        market_share = company_data["market_share"]
-        
-        # Adjust size and cost based on strategy
-        if strategy == "shrink":
-            # Shrink by 5%
-            new_size = current_size * 0.95
-            # Production cost decreases by 3%
-            new_cost = production_cost * 0.97
-        else:
-            new_size = current_size
-            new_cost = production_cost
+    results = []
+    for payoff_table, reduction, profiles in zip(payoff_tables, reductions, pure_profiles):
+        game = solve_payoff_table(payoff_table, companies, search_mixed=False, total_payoff_fallback=False,
+                                  search_correlated=False, reduction=reduction, pure_profiles=profiles)
+        results.append({
+            "nash_equilibrium": game["nash_equilibrium"],
+            "recommendations": game["recommendations"],
+            "dominance_elimination": game["dominance_elimination"],
+            "payoffs": game["full_payoffs"]
+        })
+    return results
+
+# Digest of everything a simulation result depends on besides the scenario
+def simulation_data_digest(year, base):
+    payload = json_util.dumps({
+        "year": year,
+        "base": base,
+        "model": SIMULATION_PAYOFF_MODEL,
+        "max_full_payoff_players": MAX_FULL_PAYOFF_PLAYERS
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def simulation_cache_key(data_digest, scenario):
+    payload = json.dumps([data_digest, normalize_scenario(scenario)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# Run every scenario of a simulation against one fetch of the year's data.
+# Cached results are reused and only the distinct misses are solved, as one
+# batch.
+def run_batch_simulation(year, scenarios):
+    base = load_simulation_base(year)
+    if len(base["products"]) < 2 or not all([base["market"], base["consumer"], base["economic"]]):
+        return [None] * len(scenarios)
+    
+    data_digest = simulation_data_digest(year, base)
+    keys = [simulation_cache_key(data_digest, scenario) for scenario in scenarios]
+    results = load_cached_simulations(list(dict.fromkeys(keys)))
+    
+    missing = {}
+    for key, scenario in zip(keys, scenarios):
+        if key not in results:
+            missing.setdefault(key, scenario)
+    if missing:
+        computed = dict(zip(missing, simulate_scenarios(base, list(missing.values()))))
+        store_cached_simulations(computed)
+        results.update(computed)
+    
+    return [results[key] for key in keys]
+
+# A scenario grid is a list of modifications whose fields may hold lists of
+# values. Each modification expands into its combinations of values, and
+# every combination across modifications is one composite scenario.
+def scenario_grid_axes(grid):
+    if not isinstance(grid, list) or not grid or not all(isinstance(modification, dict) for modification in grid):
+        raise ValueError("Scenario grid must be a non-empty list of modifications")
+    
+    axes = []
+    for modification in grid:
+        keys = [key for key, value in modification.items() if isinstance(value, list)]
+        axis = [dict(modification, **dict(zip(keys, values))) for values in itertools.product(*[modification[key] for key in keys])]
+        if not axis:
+            raise ValueError(f"Scenario grid modification {modification.get('type', '')} has an empty value list")
+        axes.append(axis)
+    
+    points = int(np.prod([len(axis) for axis in axes], dtype=object))
+    if points > SCENARIO_GRID_MAX_POINTS:
+        raise ValueError(f"Scenario grid has {points} points, the limit is {SCENARIO_GRID_MAX_POINTS}")
+    for axis in axes:
+        for modification in axis:
+            normalize_scenario(modification)
+    return axes
+
+def scenario_grid_points(axes):
+    return int(np.prod([len(axis) for axis in axes], dtype=object))
+
+# Composite scenarios of a grid, expanded lazily
+def iter_grid_scenarios(axes):
+    for modifications in itertools.product(*axes):
+        yield {"modifications": list(modifications)}
+
+def iter_scenario_batches(scenarios, batch_size=SCENARIO_BATCH_SIZE):
+    scenarios = iter(scenarios)
+    while True:
+        batch = list(itertools.islice(scenarios, batch_size))
+        if not batch:
+            return
+        yield batch
+
+# Expand the grid lazily and solve it batch by batch, one JSON line per
+# scenario after a header line with the number of points
+def stream_scenario_grid(base, axes, batch_size=SCENARIO_BATCH_SIZE):
+    yield json.dumps({"points": scenario_grid_points(axes)}) + "\n"
+    
+    for batch in iter_scenario_batches(iter_grid_scenarios(axes), batch_size):
+        for scenario, result in zip(batch, simulate_scenarios(base, batch)):
+            yield json.dumps({"scenario": scenario, "result": result}) + "\n"
+
+# Scenarios of a simulation request with their count; grids expand lazily
+def simulation_request_scenarios(data):
+    if 'grid' in data:
+        axes = scenario_grid_axes(data['grid'])
+        return iter_grid_scenarios(axes), scenario_grid_points(axes)
+    
+    scenarios = data['scenarios']
+    if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+        raise ValueError("Scenarios must be a list of scenario objects")
+    if len(scenarios) > SCENARIO_GRID_MAX_POINTS:
+        raise ValueError(f"Simulations take at most {SCENARIO_GRID_MAX_POINTS} scenarios")
+    for scenario in scenarios:
+        normalize_scenario(scenario)
+    return scenarios, len(scenarios)
+
+# Live state of the jobs started by this process, keyed by job id. Results
+# only live in MongoDB.
+simulation_jobs = {}
+simulation_jobs_lock = threading.Lock()
+simulation_executor = None
+
+def get_simulation_executor():
+    global simulation_executor
+    with simulation_jobs_lock:
+        if simulation_executor is None:
+            # Spawned workers do not inherit the server's threads or MongoDB client
+            simulation_executor = ProcessPoolExecutor(SIMULATION_JOB_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return simulation_executor
+
+def simulation_job_expiry():
+    return datetime.utcnow() + timedelta(seconds=SIMULATION_JOB_TTL)
+
+def save_simulation_job(job, **fields):
+    with simulation_jobs_lock:
+        job.update(fields)
+        state = {key: job[key] for key in ["year", "status", "total", "completed", "created_at", "error"]}
+    simulation_jobs_collection.update_one(
+        {"_id": job["job_id"]},
+        {"$set": dict(state, updated_at=datetime.utcnow(), expires_at=simulation_job_expiry())},
+        upsert=True
+    )
+
+# Register a job, or return None when too many jobs are active already
+def create_simulation_job(year, total):
+    with simulation_jobs_lock:
+        active = sum(job["status"] in ("queued", "running") for job in simulation_jobs.values())
+        if active >= SIMULATION_JOB_MAX_ACTIVE:
+            return None
         
-        # Calculate base profit
-        base_profit = current_price - new_cost
+        # Forget finished jobs; their state stays in MongoDB
+        for job_id in [job_id for job_id, job in simulation_jobs.items() if job["status"] not in ("queued", "running")]:
+            del simulation_jobs[job_id]
         
-        # Adjust market share based on strategies
-        # Consumer awareness penalty
-        awareness_penalty = consumer_data["shrinkflation_awareness"] / 100
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "year": year,
+            "status": "queued",
+            "total": total,
+            "completed": 0,
+            "batches": 0,
+            "created_at": datetime.utcnow(),
+            "error": None,
+            "cancel": threading.Event()
+        }
+        simulation_jobs[job["job_id"]] = job
+    
+    save_simulation_job(job)
+    return job
+
+# Dispatch a job's batches to the process pool and store each finished batch.
+# Batches are stored as they complete; "batch" gives their scenario order and
+# "seq" their completion order for event streams.
+def run_simulation_job(job, base, scenarios):
+    executor = get_simulation_executor()
+    batches = enumerate(iter_scenario_batches(scenarios))
+    pending = {}
+    save_simulation_job(job, status="running")
+    
+    try:
+        while not job["cancel"].is_set():
+            while len(pending) < SIMULATION_JOB_WORKERS:
+                next_batch = next(batches, None)
+                if next_batch is None:
+                    break
+                index, batch = next_batch
+                pending[executor.submit(simulate_scenarios, base, batch)] = (index, batch)
+            if not pending:
+                break
+            
+            done, _ = wait(pending, timeout=SIMULATION_JOB_EVENT_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, batch = pending.pop(future)
+                results = future.result()
+                simulation_job_results_collection.insert_one({
+                    "job_id": job["job_id"],
+                    "batch": index,
+                    "seq": job["batches"],
+                    "start": index * SCENARIO_BATCH_SIZE,
+                    "simulations": [{"scenario": scenario, "result": result} for scenario, result in zip(batch, results)],
+                    "expires_at": simulation_job_expiry()
+                })
+                with simulation_jobs_lock:
+                    job["batches"] += 1
+                    job["completed"] += len(batch)
+            if done:
+                save_simulation_job(job)
         
-        # Brand loyalty protection
-        brand_key = f"{company_data['company'].lower().replace(' ', '_')}_brand_loyalty"
-        brand_loyalty = consumer_data.get(brand_key, 7.0) / 10
+        status, error = ("cancelled" if job["cancel"].is_set() else "completed"), None
+    except Exception as e:
+        app.logger.exception("Simulation job %s failed", job["job_id"])
+        status, error = "failed", str(e)
+    
+    for future in pending:
+        future.cancel()
+    
+    # Keep the stored results as long as the job itself
+    simulation_job_results_collection.update_many({"job_id": job["job_id"]}, {"$set": {"expires_at": simulation_job_expiry()}})
+    save_simulation_job(job, status=status, error=error)
+
+def start_simulation_job(job, base, scenarios):
+    threading.Thread(target=run_simulation_job, args=(job, base, scenarios), daemon=True).start()
+
+# Public state of a job, from this process or from MongoDB
+def load_simulation_job(job_id):
+    with simulation_jobs_lock:
+        job = simulation_jobs.get(job_id)
+        if job is not None:
+            job = {key: job[key] for key in ["year", "status", "total", "completed", "created_at", "error"]}
+    if job is None:
+        job = simulation_jobs_collection.find_one({"_id": job_id}, {"_id": 0, "updated_at": 0, "expires_at": 0})
+    if job is None:
+        return None
+    return dict(job, job_id=job_id, created_at=job["created_at"].isoformat())
+
+def simulation_job_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Server-sent events for a job: result batches as they are stored, progress
+# every interval, and a final event named after the job's end status
+def stream_simulation_job_events(job_id):
+    sent = 0
+    while True:
+        # Read the state before the results, so a finished job's last
+        # batches are always sent before its final event
+        job = load_simulation_job(job_id)
+        if job is None:
+            return
         
-        # Market share adjustments
-        market_share_change = 0
+        stored = simulation_job_results_collection.find(
+            {"job_id": job_id, "seq": {"$gte": sent}}, {"_id": 0, "seq": 1, "start": 1, "simulations": 1}
+        ).sort("seq", 1)
+        for batch in stored:
+            yield simulation_job_event("results", {"start": batch["start"], "simulations": batch["simulations"]})
+            sent = batch["seq"] + 1
         
-        # If company shrinks but competitors don't
-        if strategy == "shrink" and competitor1_strategy == "maintain" and competitor2_strategy == "maintain":
-            # Penalty for being the only one to shrink
-            market_share_change -= awareness_penalty * (1 - brand_loyalty) * 3  # Increased from 2 to 3
+        yield simulation_job_event("progress", {"completed": job["completed"], "total": job["total"], "status": job["status"]})
+        if job["status"] not in ("queued", "running"):
+            yield simulation_job_event(job["status"], job)
+            return
+        time.sleep(SIMULATION_JOB_EVENT_INTERVAL)
+
+# One phase diagram axis: a swept parameter and its evenly spaced values
+def phase_diagram_axis(spec, default_parameter):
+    parameter = spec.get("parameter", default_parameter)
+    if parameter not in PHASE_DIAGRAM_PARAMETERS:
+        raise ValueError(f"Unknown phase diagram parameter: {parameter}")
+    low, high = PHASE_DIAGRAM_PARAMETERS[parameter]
+    steps = int(spec.get("steps", PHASE_DIAGRAM_DEFAULT_STEPS))
+    if steps < 1 or steps > PHASE_DIAGRAM_MAX_STEPS:
+        raise ValueError(f"Phase diagram axes take 1 to {PHASE_DIAGRAM_MAX_STEPS} steps")
+    return parameter, np.linspace(float(spec.get("min", low)), float(spec.get("max", high)), steps)
+
+# Set a swept parameter on batched payoff inputs, one value per cell
+def apply_phase_parameter(inputs, parameter, values):
+    if parameter == "shrinkflation_awareness":
+        inputs["awareness"] = values / 100
+    elif parameter == "consumer_confidence_index":
+        inputs["confidence"] = values
+    elif parameter == "production_cost_change":
+        inputs["cost"] = inputs["cost"] * (1 + values[:, np.newaxis] / 100)
+    elif parameter == "price_change":
+        inputs["price"] = inputs["price"] * (1 + values[:, np.newaxis] / 100)
+
+# Pure Nash equilibria in every cell of a (y, x) parameter grid. Cells are
+# solved in chunks, each chunk as one batch of games, and cells with the same
+# equilibrium set share a region. Returns the (Y x X) region labels and each
+# region's equilibrium profiles.
+def compute_phase_diagram(inputs, x_parameter, x_values, y_parameter, y_values, model=PAYOFF_MODEL, chunk_size=PHASE_DIAGRAM_CHUNK_SIZE):
+    n_players = len(inputs["companies"])
+    n_cells = len(x_values) * len(y_values)
+    chunk_cells = max(1, chunk_size // (2 * n_players * n_players + 2 ** n_players))
+    labels = np.empty(n_cells, dtype=np.int32)
+    regions = {}
+    
+    for start in range(0, n_cells, chunk_cells):
+        cells = np.arange(start, min(start + chunk_cells, n_cells))
+        y_index, x_index = np.divmod(cells, len(x_values))
+        batch = {key: np.broadcast_to(inputs[key], (cells.size, n_players)) for key in ["price", "cost", "market_share", "loyalty"]}
+        batch["companies"] = inputs["companies"]
+        batch["awareness"] = np.full(cells.size, inputs["awareness"], dtype=float)
+        batch["confidence"] = np.full(cells.size, inputs["confidence"], dtype=float)
+        apply_phase_parameter(batch, x_parameter, x_values[x_index])
+        apply_phase_parameter(batch, y_parameter, y_values[y_index])
         
-        # If company maintains but competitors shrink
-        elif strategy == "maintain" and competitor1_strategy == "shrink" and competitor2_strategy == "shrink":
-            # Bonus for being the only one to maintain
-            market_share_change += awareness_penalty * 2.5  # Increased from 1.5 to 2.5
+        masks = find_pure_nash_mask(payoff_table_from_inputs(batch, model)).reshape(cells.size, -1)
+        packed = np.packbits(masks, axis=1)
         
-        # If everyone shrinks
-        elif strategy == "shrink" and competitor1_strategy == "shrink" and competitor2_strategy == "shrink":
-            # Small penalty as consumers have no alternative
-            market_share_change -= awareness_penalty * 0.3  # Reduced from 0.5 to 0.3
+        # Up to 64 profiles an equilibrium set fits one integer key, which
+        # sorts much faster than rows of bytes
+        keys = packed
+        if packed.shape[1] <= 8:
+            keys = np.zeros((cells.size, 8), dtype=np.uint8)
+            keys[:, :packed.shape[1]] = packed
+            keys = keys.view(np.uint64).ravel()
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        region_ids = np.array([regions.setdefault(pattern.tobytes(), len(regions)) for pattern in packed[first]])
+        labels[cells] = region_ids[inverse.reshape(-1)]
+    
+    shape = (2,) * n_players
+    region_profiles = [
+        [tuple(int(s) for s in np.unravel_index(index, shape)) for index in np.flatnonzero(np.unpackbits(np.frombuffer(pattern, dtype=np.uint8))[:2 ** n_players])]
+        for pattern in regions
+    ]
+    return labels.reshape(len(y_values), len(x_values)), region_profiles
+
+# Categorical heatmap of phase diagram regions as a base64 PNG
+def phase_diagram_image(labels, region_names, x_parameter, x_values, y_parameter, y_values):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    colors = chart_colors(len(region_names))
+    
+    data = pd.DataFrame(labels, index=np.round(y_values, 2), columns=np.round(x_values, 2))
+    sns.heatmap(data, cmap=colors, vmin=-0.5, vmax=len(region_names) - 0.5, cbar=False,
+                xticklabels=max(1, len(x_values) // 10), yticklabels=max(1, len(y_values) // 10), ax=ax)
+    ax.invert_yaxis()
+    ax.set_title("Equilibrium Phase Diagram")
+    ax.set_xlabel(x_parameter)
+    ax.set_ylabel(y_parameter)
+    ax.legend(handles=[Patch(color=color, label=name) for color, name in zip(colors, region_names)],
+              loc="upper center", bbox_to_anchor=(0.5, -0.15), fontsize="small")
+    
+    buf = io.BytesIO()
+    fig.tight_layout()
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    
+    return f"data:image/png;base64,{base64.b64encode(buf.getvalue()).decode('utf-8')}"
+
+# Monte Carlo distributions: the defaults overridden by the request
+def parse_monte_carlo_distributions(spec):
+    distributions = dict(MONTE_CARLO_DISTRIBUTIONS)
+    for name, sd in spec.items():
+        if name not in distributions:
+            raise ValueError(f"Unknown Monte Carlo input: {name}")
+        if float(sd) < 0:
+            raise ValueError("Monte Carlo standard deviations must not be negative")
+        distributions[name] = float(sd)
+    return distributions
+
+# Draw a chunk of payoff inputs around the base inputs from normal
+# distributions, clipped to valid ranges
+def draw_monte_carlo_inputs(inputs, distributions, size, rng):
+    n_players = len(inputs["companies"])
+    
+    def noise(shape):
+        return norm.rvs(size=shape, random_state=rng)
+    
+    def relative(values, sd):
+        return np.maximum(0, values * (1 + sd * noise((size, n_players))))
+    
+    return {
+        "companies": inputs["companies"],
+        "awareness": np.clip(inputs["awareness"] + distributions["shrinkflation_awareness"] / 100 * noise(size), 0, 1),
+        "confidence": np.maximum(0, inputs["confidence"] + distributions["consumer_confidence_index"] * noise(size)),
+        "loyalty": np.clip(inputs["loyalty"] + distributions["brand_loyalty"] / 10 * noise((size, n_players)), 0, 1),
+        "cost": relative(inputs["cost"], distributions["production_cost"]),
+        "market_share": relative(inputs["market_share"], distributions["market_share"]),
+        "price": relative(inputs["price"], distributions["price"])
+    }
+
+# Recommended profile index (row-major) for a batch of games: the first pure
+# Nash equilibrium, or the best total payoff without one. Also returns the
+# equilibrium masks and each player's payoff at the recommended profile.
+def recommended_profiles(payoff_tables):
+    batch_size, n_players = payoff_tables.shape[0], payoff_tables.shape[-3]
+    axes, total_shrinking = strategy_axes(n_players)
+    masks = find_pure_nash_mask(payoff_tables).reshape(batch_size, -1)
+    
+    totals = np.zeros(masks.shape)
+    for i in range(n_players):
+        totals += player_payoff_tensor(payoff_tables, i, axes, total_shrinking).reshape(batch_size, -1)
+    
+    has_equilibrium = masks.any(axis=1)
+    recommended = np.where(has_equilibrium, masks.argmax(axis=1), totals.argmax(axis=1))
+    
+    rows = np.arange(batch_size)
+    payoffs = np.stack([
+        player_payoff_tensor(payoff_tables, i, axes, total_shrinking).reshape(batch_size, -1)[rows, recommended]
+        for i in range(n_players)
+    ], axis=1)
+    return masks, recommended, payoffs
+
+# Solve the game for many draws of its inputs, chunk by chunk. Payoffs are
+# rounded to cents on a capped scale, so their quantiles are exact from
+# per-cent counts and memory does not grow with the sample count.
+def monte_carlo_game(inputs, samples, seed, distributions, model=PAYOFF_MODEL, chunk_size=MONTE_CARLO_CHUNK_SIZE):
+    n_players = len(inputs["companies"])
+    n_profiles = 2 ** n_players
+    payoff_ticks = int(round(model["payoff_cap"] * 100)) + 1
+    equilibrium_counts = np.zeros(n_profiles, dtype=np.int64)
+    recommendation_counts = np.zeros(n_profiles, dtype=np.int64)
+    payoff_counts = np.zeros((n_players, payoff_ticks), dtype=np.int64)
+    no_equilibrium = 0
+    
+    chunk_starts = range(0, samples, chunk_size)
+    for start, chunk_seed in zip(chunk_starts, np.random.SeedSequence(seed).spawn(len(chunk_starts))):
+        size = min(chunk_size, samples - start)
+        batch = draw_monte_carlo_inputs(inputs, distributions, size, np.random.default_rng(chunk_seed))
+        masks, recommended, payoffs = recommended_profiles(payoff_table_from_inputs(batch, model))
         
-        # If company shrinks and one competitor maintains
-        elif strategy == "shrink" and (competitor1_strategy == "maintain" or competitor2_strategy == "maintain"):
-            # Moderate penalty
-            market_share_change -= awareness_penalty * (1 - brand_loyalty) * 1.5  # Increased from 1 to 1.5
+        equilibrium_counts += masks.sum(axis=0)
+        no_equilibrium += int(size - masks.any(axis=1).sum())
+        recommendation_counts += np.bincount(recommended, minlength=n_profiles)
+        ticks = np.clip(np.rint(payoffs * 100).astype(np.int64), 0, payoff_ticks - 1)
+        for i in range(n_players):
+            payoff_counts[i] += np.bincount(ticks[:, i], minlength=payoff_ticks)
+    
+    return {
+        "equilibrium_counts": equilibrium_counts,
+        "recommendation_counts": recommendation_counts,
+        "payoff_counts": payoff_counts,
+        "no_equilibrium": no_equilibrium
+    }
+
+# Quantiles of a distribution of payoffs given as counts per cent
+def payoff_count_quantiles(counts, quantiles):
+    cdf = np.cumsum(counts) / counts.sum()
+    return [float(np.searchsorted(cdf, q)) / 100 for q in quantiles]
+
+# Sensitivity factors: the market-wide drivers, then brand loyalty,
+# production cost and market share for every company
+def sensitivity_factors(companies):
+    factors = [
+        {"name": "shrinkflation_awareness", "input": "shrinkflation_awareness", "company": None},
+        {"name": "consumer_confidence_index", "input": "consumer_confidence_index", "company": None}
+    ]
+    for name in ["brand_loyalty", "production_cost", "market_share"]:
+        factors += [{"name": f"{company}: {name}", "input": name, "company": i} for i, company in enumerate(companies)]
+    return factors
+
+# Payoff inputs for samples in the unit hypercube, one column per factor
+# mapped onto its range around the base inputs
+def sensitivity_inputs(inputs, factors, unit_samples):
+    size = unit_samples.shape[0]
+    n_players = len(inputs["companies"])
+    batch = {
+        "companies": inputs["companies"],
+        "awareness": np.full(size, inputs["awareness"], dtype=float),
+        "confidence": np.full(size, inputs["confidence"], dtype=float),
+        "loyalty": np.tile(inputs["loyalty"], (size, 1)),
+        "cost": np.tile(inputs["cost"], (size, 1)),
+        "market_share": np.tile(inputs["market_share"], (size, 1)),
+        "price": np.broadcast_to(inputs["price"], (size, n_players))
+    }
+    
+    for j, factor in enumerate(factors):
+        spread = (2 * unit_samples[:, j] - 1) * SENSITIVITY_RANGES[factor["input"]]
+        i = factor["company"]
+        if factor["input"] == "shrinkflation_awareness":
+            batch["awareness"] = np.clip(batch["awareness"] + spread / 100, 0, 1)
+        elif factor["input"] == "consumer_confidence_index":
+            batch["confidence"] = np.maximum(0, batch["confidence"] + spread)
+        elif factor["input"] == "brand_loyalty":
+            batch["loyalty"][:, i] = np.clip(batch["loyalty"][:, i] + spread / 10, 0, 1)
+        elif factor["input"] == "production_cost":
+            batch["cost"][:, i] = np.maximum(0, batch["cost"][:, i] * (1 + spread))
+        elif factor["input"] == "market_share":
+            batch["market_share"][:, i] = np.maximum(0, batch["market_share"][:, i] * (1 + spread))
+    return batch
+
+# Model outputs for a chunk of unit samples: each company's payoff at the
+# recommended profile, then whether it is recommended to shrink
+def evaluate_sensitivity_chunk(inputs, factors, unit_samples, model=PAYOFF_MODEL):
+    n_players = len(inputs["companies"])
+    tables = payoff_table_from_inputs(sensitivity_inputs(inputs, factors, unit_samples), model)
+    _, recommended, payoffs = recommended_profiles(tables)
+    shrink = (recommended[:, np.newaxis] >> np.arange(n_players - 1, -1, -1)) & 1
+    return np.concatenate([payoffs, shrink], axis=1)
+
+# Evaluate a sample matrix in chunks, which bounds the size of the stacked
+# payoff tables. A full design takes milliseconds in process, far less than
+# starting workers or waiting behind simulation jobs.
+def evaluate_sensitivity_samples(inputs, factors, unit_samples, model=PAYOFF_MODEL):
+    return np.concatenate([
+        evaluate_sensitivity_chunk(inputs, factors, unit_samples[start:start + SENSITIVITY_CHUNK_SIZE], model)
+        for start in range(0, len(unit_samples), SENSITIVITY_CHUNK_SIZE)
+    ])
+
+# Morris trajectories in the unit hypercube: each starts on the level grid and
+# moves one factor at a time by delta, in a random order and direction.
+# Returns the (r x k+1 x k) points, the factor moved at each step and the
+# signed step sizes.
+def morris_trajectories(n_factors, trajectories, levels, rng):
+    delta = levels / (2 * (levels - 1))
+    start = rng.integers(0, levels // 2, (trajectories, n_factors)) / (levels - 1)
+    direction = rng.choice([-1.0, 1.0], (trajectories, n_factors))
+    start = start + delta * (direction < 0)
+    order = np.argsort(rng.random((trajectories, n_factors)), axis=1)
+    step_sizes = np.take_along_axis(direction, order, axis=1) * delta
+    
+    steps = np.zeros((trajectories, n_factors + 1, n_factors))
+    steps[np.arange(trajectories)[:, np.newaxis], np.arange(1, n_factors + 1), order] = step_sizes
+    return start[:, np.newaxis, :] + np.cumsum(steps, axis=1), order, step_sizes
+
+# Morris statistics per factor and output from the trajectory outputs
+def morris_statistics(outputs, order, step_sizes):
+    trajectories = outputs.shape[0]
+    effects = np.empty((trajectories, order.shape[1], outputs.shape[2]))
+    effects[np.arange(trajectories)[:, np.newaxis], order] = np.diff(outputs, axis=1) / step_sizes[..., np.newaxis]
+    return {
+        "mu_star": np.abs(effects).mean(axis=0),
+        "mu": effects.mean(axis=0),
+        "sigma": effects.std(axis=0, ddof=1) if trajectories > 1 else np.zeros(effects.shape[1:])
+    }
+
+# Saltelli design from a scrambled Sobol sequence: the A and B matrices and,
+# for every factor, A with that column taken from B
+def saltelli_samples(n_factors, samples, seed):
+    base = qmc.Sobol(2 * n_factors, scramble=True, seed=seed).random(samples)
+    a, b = base[:, :n_factors], base[:, n_factors:]
+    ab = np.repeat(a[np.newaxis], n_factors, axis=0)
+    ab[np.arange(n_factors), :, np.arange(n_factors)] = b.T
+    return a, b, ab
+
+# First order (Saltelli 2010) and total (Jansen) Sobol indices per factor and
+# output; outputs that never vary have no indices
+def sobol_indices(f_a, f_b, f_ab):
+    variance = np.var(np.concatenate([f_a, f_b]), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first_order = np.mean(f_b[np.newaxis] * (f_ab - f_a[np.newaxis]), axis=1) / variance
+        total = 0.5 * np.mean((f_a[np.newaxis] - f_ab) ** 2, axis=1) / variance
+    return {
+        "first_order": np.where(variance > 0, first_order, np.nan),
+        "total": np.where(variance > 0, total, np.nan)
+    }
+
+def sensitivity_value(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+# Morris screening and Sobol indices of each company's payoff and strategy
+# over the sensitivity factors. Both designs are evaluated as one sample
+# matrix.
+def sensitivity_analysis(inputs, seed=SENSITIVITY_SEED, model=PAYOFF_MODEL):
+    companies = inputs["companies"]
+    n_players = len(companies)
+    factors = sensitivity_factors(companies)
+    n_factors = len(factors)
+    rng = np.random.default_rng(seed)
+    
+    points, order, step_sizes = morris_trajectories(n_factors, SENSITIVITY_MORRIS_TRAJECTORIES, SENSITIVITY_MORRIS_LEVELS, rng)
+    a, b, ab = saltelli_samples(n_factors, SENSITIVITY_SOBOL_SAMPLES, seed)
+    samples = np.concatenate([points.reshape(-1, n_factors), a, b, ab.reshape(-1, n_factors)])
+    outputs = evaluate_sensitivity_samples(inputs, factors, samples, model)
+    
+    n_morris = points.shape[0] * points.shape[1]
+    n_sobol = SENSITIVITY_SOBOL_SAMPLES
+    morris = morris_statistics(outputs[:n_morris].reshape(points.shape[0], points.shape[1], -1), order, step_sizes)
+    sobol_outputs = outputs[n_morris:]
+    sobol = sobol_indices(sobol_outputs[:n_sobol], sobol_outputs[n_sobol:2 * n_sobol], sobol_outputs[2 * n_sobol:].reshape(n_factors, n_sobol, -1))
+    
+    # Outputs are each company's payoff, then its shrink recommendation
+    def by_output(statistics):
+        return {
+            company: {
+                output_name: {
+                    factor["name"]: {name: sensitivity_value(values[j, column]) for name, values in statistics.items()}
+                    for j, factor in enumerate(factors)
+                }
+                for output_name, column in [("payoff", i), ("shrink", n_players + i)]
+            }
+            for i, company in enumerate(companies)
+        }
+    
+    return {
+        "companies": companies,
+        "factors": [factor["name"] for factor in factors],
+        "ranges": SENSITIVITY_RANGES,
+        "morris": by_output(morris),
+        "sobol": by_output(sobol),
+        "samples": {"morris": n_morris, "sobol": n_sobol * (n_factors + 2)},
+        "seed": seed
+    }
+
+# Cache key of a year's sensitivity analysis: its inputs and settings
+def sensitivity_key(year, base):
+    payload = json_util.dumps({
+        "year": year,
+        "base": base,
+        "model": PAYOFF_MODEL,
+        "ranges": SENSITIVITY_RANGES,
+        "settings": [SENSITIVITY_MORRIS_TRAJECTORIES, SENSITIVITY_MORRIS_LEVELS, SENSITIVITY_SOBOL_SAMPLES, SENSITIVITY_SEED]
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def qre_key(year, payoff_table):
+    payload = json.dumps({
+        "year": year,
+        "payoff_table": payoff_table.tolist(),
+        "settings": [QRE_LAMBDA_MAX, QRE_REPORT_LAMBDAS, QRE_MAX_STEPS, QRE_INITIAL_STEP, QRE_MAX_STEP, QRE_TOLERANCE]
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def parse_rolling_dynamics(spec):
+    dynamics = dict(ROLLING_SIMULATION_DYNAMICS)
+    for name, value in spec.items():
+        if name not in dynamics:
+            raise ValueError(f"Unknown rolling simulation parameter: {name}")
+        dynamics[name] = float(value)
+        if name != "cost_drift" and dynamics[name] < 0:
+            raise ValueError(f"Rolling simulation parameter {name} must not be negative")
+    return dynamics
+
+# Mean and percentiles over paths of a (paths x ...) array
+def path_summary(values):
+    percentiles = np.percentile(values, ROLLING_PERCENTILES, axis=0)
+    summary = {"mean": np.round(values.mean(axis=0), 4).tolist()}
+    for q, value in zip(ROLLING_PERCENTILES, percentiles):
+        summary[f"p{q}"] = np.round(value, 4).tolist()
+    return summary
+
+# Roll the game forward over many stochastic paths at once. Every period each
+# path plays its recommended profile; shrinking lowers size and production
+# cost for good, the realized market shares carry over and awareness grows
+# with the share of companies shrinking. State lives in (paths x companies)
+# arrays and only per-period summaries are kept.
+def rolling_simulation(inputs, sizes, periods, paths, seed, dynamics=ROLLING_SIMULATION_DYNAMICS, model=PAYOFF_MODEL):
+    companies = inputs["companies"]
+    n_players = len(companies)
+    players = np.arange(n_players)
+    rng = np.random.default_rng(seed)
+    state = {
+        "companies": companies,
+        "price": np.tile(inputs["price"], (paths, 1)),
+        "cost": np.tile(inputs["cost"], (paths, 1)),
+        "market_share": np.tile(inputs["market_share"], (paths, 1)),
+        "loyalty": np.tile(inputs["loyalty"], (paths, 1)),
+        "awareness": np.full(paths, inputs["awareness"], dtype=float),
+        "confidence": np.full(paths, inputs["confidence"], dtype=float)
+    }
+    sizes = np.tile(np.asarray(sizes, dtype=float), (paths, 1))
+    timeline = []
+    
+    for period in range(1, periods + 1):
+        _, recommended, payoffs = recommended_profiles(payoff_table_from_inputs(state, model))
+        shrinking = ((recommended[:, np.newaxis] >> (n_players - 1 - players)) & 1).astype(bool)
         
-        # Adjust for economic conditions
-        # economic_factor = economic_data["consumer_confidence_index"] / 70  # type: ignore # Normalize around 70
-        # market_share_change *= economic_factor
+        # Market shares the chosen profile leads to
+        rivals_shrinking = (shrinking.sum(axis=1, keepdims=True) - shrinking)[:, np.newaxis, :, np.newaxis]
+        outcomes = strategy_outcomes(
+            state, players, (shrinking * (1 - model["shrink_size_factor"]))[:, np.newaxis, :, np.newaxis], 0.0,
+            rivals_shrinking, rivals_shrinking.astype(float), 0.0, n_players, model
+        )
+        market_share = np.broadcast_to(outcomes["market_share"], (paths, 1, n_players, 1)).reshape(paths, n_players)
         
-        # Calculate new market share
-        new_market_share = market_share
+        timeline.append({
+            "period": period,
+            "awareness": path_summary(state["awareness"] * 100),
+            "consumer_confidence": path_summary(state["confidence"]),
+            "companies": {
+                company: {
+                    "shrink_rate": round(float(shrinking[:, i].mean()), 4),
+                    "size": path_summary(sizes[:, i]),
+                    "production_cost": path_summary(state["cost"][:, i]),
+                    "market_share": path_summary(state["market_share"][:, i]),
+                    "payoff": path_summary(payoffs[:, i])
+                }
+                for i, company in enumerate(companies)
+            }
+        })
         
-        # Calculate profit based on market share and profit margin
-        market_size = 1000000  # Assumed market size in units
-        units_sold = (market_size * new_market_share / 100)
-        total_profit = units_sold * base_profit
+        # Carry the state into the next period
+        sizes = np.where(shrinking, sizes * model["shrink_size_factor"], sizes)
+        cost_shocks = np.exp(dynamics["cost_drift"] + dynamics["cost_volatility"] * rng.standard_normal((paths, n_players)) - dynamics["cost_volatility"] ** 2 / 2)
+        state["cost"] = np.where(shrinking, state["cost"] * model["shrink_cost_factor"], state["cost"]) * cost_shocks
+        state["market_share"] = np.clip(market_share * (1 + dynamics["share_volatility"] * rng.standard_normal((paths, n_players))), 0, 100)
+        state["awareness"] = np.clip(
+            state["awareness"] * (1 - dynamics["awareness_decay"])
+            + (dynamics["awareness_gain"] * shrinking.mean(axis=1) + dynamics["awareness_volatility"] * rng.standard_normal(paths)) / 100,
+            0, 1
+        )
+        state["confidence"] = np.maximum(0, state["confidence"] + dynamics["confidence_volatility"] * rng.standard_normal(paths))
+    
+    return timeline
+
+# Draw a consumer population from the year's consumer data: awareness of
+# shrinkflation, per-brand loyalty around each brand's score, lognormal price
+# sensitivity scaled by how much consumers weigh price against quantity, and a
+# current brand drawn from the market shares. Brand constants are calibrated
+# so the population reproduces the market shares when nobody shrinks.
+# Per-brand arrays are brand-major (brands x agents) so the reductions over
+# the few brands run across contiguous rows. The population is deliberately a
+# dict of column arrays, not structured per-agent records: an agent-major
+# record array made the choice step about 15x slower at millions of agents.
+def create_agent_population(company_docs, consumer_data, count, rng, params=AGENT_MARKET_MODEL, model=PAYOFF_MODEL):
+    n_brands = len(company_docs)
+    sensitivity = consumer_data.get("price_vs_quantity_importance", 1.0)
+    sigma = params["sensitivity_dispersion"]
+    loyalty = np.array([company_brand_loyalty(doc["company"], consumer_data) for doc in company_docs], dtype=np.float32)
+    shares = np.array([doc["market_share"] for doc in company_docs], dtype=float)
+    shares /= shares.sum()
+    
+    population = {
+        "aware": rng.random(count, dtype=np.float32) < consumer_data["shrinkflation_awareness"] / 100,
+        "price_sensitivity": sensitivity * np.exp(sigma * rng.standard_normal(count, dtype=np.float32) - sigma ** 2 / 2),
+        "loyalty": np.clip(loyalty[:, np.newaxis] + params["loyalty_dispersion"] * rng.standard_normal((n_brands, count), dtype=np.float32), 0, 1),
+        "brand": rng.choice(n_brands, size=count, p=shares).astype(np.int16),
+        "brand_constant": np.zeros(n_brands, dtype=np.float32)
+    }
+    
+    # Fixed point on log shares over a sample of the population
+    sample = agent_population_slice(population, 0, AGENT_CALIBRATION_SAMPLE)
+    prices = np.array([doc["price"] for doc in company_docs], dtype=float)
+    sizes = np.array([doc["size"] for doc in company_docs], dtype=float)
+    maintaining = np.zeros(n_brands, dtype=bool)
+    unit_price = profile_unit_prices(prices, sizes, maintaining, model)
+    for _ in range(AGENT_CALIBRATION_ITERATIONS):
+        predicted = agent_choice_probabilities(sample, unit_price, maintaining, params).mean(axis=1)
+        step = np.log(shares) - np.log(predicted)
+        population["brand_constant"] += step.astype(np.float32)
+        if np.abs(step).max() < 1e-6:
+            break
+    return population
+
+# View of agents start to stop; brand constants are shared
+def agent_population_slice(population, start, stop):
+    return {
+        "aware": population["aware"][start:stop],
+        "price_sensitivity": population["price_sensitivity"][start:stop],
+        "loyalty": population["loyalty"][:, start:stop],
+        "brand": population["brand"][start:stop],
+        "brand_constant": population["brand_constant"]
+    }
+
+# Unit price (price per size) of every brand for a profile of strategies
+def profile_unit_prices(prices, sizes, shrinking, model=PAYOFF_MODEL):
+    return prices / (sizes * np.where(shrinking, model["shrink_size_factor"], 1.0))
+
+# Utility every agent gets from each brand before prices and shrinking:
+# loyalty, the calibrated brand constant and staying with the current brand
+def agent_base_utilities(population, params=AGENT_MARKET_MODEL):
+    n_brands = len(population["brand_constant"])
+    utility = np.float32(params["loyalty_weight"]) * population["loyalty"]
+    utility += population["brand_constant"][:, np.newaxis]
+    utility += np.float32(params["inertia"]) * (population["brand"] == np.arange(n_brands)[:, np.newaxis])
+    return utility
+
+# Logit brand choice probabilities (brands x agents) given each brand's unit
+# price and whether it shrinks
+def agent_choice_probabilities(population, unit_price, shrinking, params=AGENT_MARKET_MODEL, base_utility=None):
+    if base_utility is None:
+        base_utility = agent_base_utilities(population, params)
+    relative_price = np.float32(params["price_weight"]) * np.log(unit_price / unit_price.mean()).astype(np.float32)
+    shrink_penalty = np.float32(params["shrink_aversion"]) * np.asarray(shrinking, dtype=np.float32)
+    
+    utility = -relative_price[:, np.newaxis] * population["price_sensitivity"]
+    utility += base_utility
+    utility -= shrink_penalty[:, np.newaxis] * population["aware"]
+    utility -= utility.max(axis=0)
+    probabilities = np.exp(utility, out=utility)
+    probabilities /= probabilities.sum(axis=0)
+    return probabilities
+
+# One market period: every agent draws a brand from its choice probabilities
+# and keeps it as its current brand. Returns the market shares in percent.
+def agent_market_period(population, prices, sizes, shrinking, rng, params=AGENT_MARKET_MODEL, model=PAYOFF_MODEL, chunk_size=AGENT_CHUNK_SIZE):
+    unit_price = profile_unit_prices(prices, sizes, shrinking, model)
+    count = len(population["brand"])
+    for start in range(0, count, chunk_size):
+        chunk = agent_population_slice(population, start, start + chunk_size)
+        cumulative = np.cumsum(agent_choice_probabilities(chunk, unit_price, shrinking, params), axis=0)
+        draws = rng.random(cumulative.shape[1], dtype=np.float32) * cumulative[-1]
+        chunk["brand"][:] = np.minimum((cumulative < draws).sum(axis=0), len(prices) - 1)
+    return np.bincount(population["brand"], minlength=len(prices)) / count * 100
+
+# Expected market shares in percent for every strategy profile (row-major),
+# averaged over the population in chunks
+def agent_profile_shares(population, prices, sizes, params=AGENT_MARKET_MODEL, model=PAYOFF_MODEL, chunk_size=AGENT_CHUNK_SIZE):
+    n_brands = len(prices)
+    count = len(population["brand"])
+    profiles = np.array(list(itertools.product([0, 1], repeat=n_brands)), dtype=bool)
+    shares = np.zeros((len(profiles), n_brands))
+    for start in range(0, count, chunk_size):
+        chunk = agent_population_slice(population, start, start + chunk_size)
+        base_utility = agent_base_utilities(chunk, params)
+        for p, shrinking in enumerate(profiles):
+            unit_price = profile_unit_prices(prices, sizes, shrinking, model)
+            shares[p] += agent_choice_probabilities(chunk, unit_price, shrinking, params, base_utility).sum(axis=1, dtype=np.float64)
+    return profiles, shares / count * 100
+
+# Largest payoff change from switching strategy anywhere in the table, the
+# payoff unit of the evolutionary dynamics
+def evolutionary_gain_scale(payoff_table):
+    return np.abs(payoff_table[:, 1] - payoff_table[:, 0]).max() or 1.0
+
+# Rate of change of the shrinking shares x (..., player). Payoff gains are
+# normalized by the largest gain from shrinking in the table so time and
+# rationality work on the same scale for every year.
+def evolutionary_velocity(payoff_table, x, dynamics="replicator", rationality=EVOLUTIONARY_DEFAULT_RATIONALITY):
+    gain = mixed_strategy_gains(payoff_table, x) / evolutionary_gain_scale(payoff_table)
+    if dynamics == "logit":
+        return expit(rationality * gain) - x
+    return x * (1 - x) * gain
+
+# Integrate the dynamics from every initial state (samples, player) at once
+# as one vectorized ODE system. Returns the states at the given times,
+# shaped (times, samples, player).
+def evolutionary_trajectories(payoff_table, initial, times, dynamics="replicator", rationality=EVOLUTIONARY_DEFAULT_RATIONALITY):
+    shape = initial.shape
+    solution = integrate.solve_ivp(
+        lambda t, y: evolutionary_velocity(payoff_table, y.reshape(shape), dynamics, rationality).ravel(),
+        (times[0], times[-1]), initial.ravel(), t_eval=times, rtol=1e-6, atol=1e-8
+    )
+    if not solution.success:
+        raise ValueError(f"Evolutionary dynamics failed to integrate: {solution.message}")
+    return np.clip(solution.y.T.reshape((len(times),) + shape), 0.0, 1.0)
+
+# Group final states into attractors: shares within the tolerance of 0 or 1
+# snap to the pure strategy, the rest are binned at the basin resolution.
+# Returns the attractor states, each sample's attractor index and the basin
+# sizes.
+def evolutionary_basins(final, tolerance=EVOLUTIONARY_PURE_TOLERANCE, resolution=EVOLUTIONARY_BASIN_RESOLUTION):
+    pure = (final <= tolerance) | (final >= 1 - tolerance)
+    snapped = np.where(pure, np.round(final), final)
+    keys = np.where(pure, -1 - np.round(final), np.round(final / resolution)).astype(np.int64)
+    cells, labels, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    labels = labels.reshape(-1)
+    attractors = np.zeros(cells.shape)
+    np.add.at(attractors, labels, snapped)
+    return attractors / counts[:, np.newaxis], labels, counts
+
+def evolutionary_game(payoff_table, companies, samples, seed, horizon=EVOLUTIONARY_DEFAULT_HORIZON,
+                      dynamics="replicator", rationality=EVOLUTIONARY_DEFAULT_RATIONALITY,
+                      n_trajectories=EVOLUTIONARY_DEFAULT_TRAJECTORIES, initial=None):
+    # Interior starting mixes, so replicator dynamics can move every population
+    if initial is None:
+        initial = np.random.default_rng(seed).uniform(0.01, 0.99, (samples, len(companies)))
+    times = np.linspace(0.0, horizon, EVOLUTIONARY_TIME_POINTS)
+    states = evolutionary_trajectories(payoff_table, initial, times, dynamics, rationality)
+    
+    final = states[-1]
+    settled = np.abs(evolutionary_velocity(payoff_table, final, dynamics, rationality)).max(axis=-1) <= EVOLUTIONARY_CONVERGENCE
+    attractors, labels, counts = evolutionary_basins(final)
+    regret = mixed_strategy_regret(payoff_table, attractors).max(axis=-1)
+    order = np.argsort(-counts, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    
+    return {
+        "times": np.round(times, 4).tolist(),
+        "settled": float(settled.mean()),
+        "attractors": [
+            {
+                "profile": format_mixed_profile(companies, attractors[a]),
+                "shrink": {company: round(float(attractors[a][i]), 4) for i, company in enumerate(companies)},
+                "basin": float(counts[a] / len(final)),
+                "nash": bool(regret[a] <= EVOLUTIONARY_NASH_TOLERANCE * evolutionary_gain_scale(payoff_table)),
+                "regret": round(float(regret[a]), 4)
+            }
+            for a in order
+        ],
+        "trajectories": [
+            {
+                "initial": {company: round(float(initial[n][i]), 4) for i, company in enumerate(companies)},
+                "attractor": int(rank[labels[n]]),
+                "shrink": {company: np.round(states[:, n, i], 4).tolist() for i, company in enumerate(companies)}
+            }
+            for n in range(min(n_trajectories, len(initial)))
+        ],
+        # Attractor of every initial state, for drawing the basins
+        "initial": np.round(initial, 4).tolist(),
+        "basins": rank[labels].tolist()
+    }
+
+# Market share change table (player x strategy x rivals shrinking) for the
+# payoff model: each profile's agent shares against all maintaining. The
+# table form only knows how many rivals shrink, so profiles with the same
+# count are averaged.
+def agent_share_change_table(profiles, shares):
+    n_players = profiles.shape[1]
+    changes = shares - shares[0]
+    shrinking = profiles.astype(int)
+    rivals = shrinking.sum(axis=1, keepdims=True) - shrinking
+    players = np.broadcast_to(np.arange(n_players), profiles.shape)
+    
+    totals = np.zeros((n_players, 2, n_players))
+    counts = np.zeros((n_players, 2, n_players))
+    np.add.at(totals, (players, shrinking, rivals), changes)
+    np.add.at(counts, (players, shrinking, rivals), 1)
+    return totals / counts
+
+def parse_bayesian_settings(spec):
+    settings = dict(BAYESIAN_GAME)
+    for name, value in spec.items():
+        if name not in settings:
+            raise ValueError(f"Unknown Bayesian game setting: {name}")
+        settings[name] = int(value) if name.endswith("_levels") else float(value)
+    if settings["awareness_levels"] < 1 or settings["cost_levels"] < 1:
+        raise ValueError("Bayesian games need at least one awareness and one cost level")
+    if settings["awareness_levels"] * settings["cost_levels"] > BAYESIAN_MAX_TYPES:
+        raise ValueError(f"Bayesian games support up to {BAYESIAN_MAX_TYPES} types per firm")
+    if settings["awareness_sd"] < 0 or settings["cost_sd"] < 0 or not 0 <= settings["signal_accuracy"] <= 1:
+        raise ValueError("Standard deviations must not be negative and the signal accuracy must be in [0, 1]")
+    return settings
+
+# Type space and beliefs of the Bayesian game. Type t of a firm is cost level
+# t // awareness_levels and awareness signal t % awareness_levels. Returns
+# the awareness and cost levels, the state prior, the type likelihoods
+# P(t | state) and the posteriors P(state | t).
+def bayesian_types(inputs, settings):
+    awareness_nodes, awareness_weights = np.polynomial.hermite_e.hermegauss(settings["awareness_levels"])
+    cost_nodes, cost_weights = np.polynomial.hermite_e.hermegauss(settings["cost_levels"])
+    prior = awareness_weights / awareness_weights.sum()
+    cost_prior = cost_weights / cost_weights.sum()
+    
+    n_states = settings["awareness_levels"]
+    accuracy = settings["signal_accuracy"] if n_states > 1 else 1.0
+    signal = np.where(np.eye(n_states, dtype=bool), accuracy, (1 - accuracy) / max(n_states - 1, 1))
+    likelihood = (cost_prior[:, np.newaxis, np.newaxis] * signal[np.newaxis]).transpose(1, 0, 2).reshape(n_states, -1)
+    posterior = (prior[:, np.newaxis] * signal).T
+    posterior = np.tile(posterior / posterior.sum(axis=1, keepdims=True), (settings["cost_levels"], 1))
+    
+    return {
+        "awareness": np.clip(inputs["awareness"] + settings["awareness_sd"] / 100 * awareness_nodes, 0, 1),
+        "cost_scale": np.maximum(0, 1 + settings["cost_sd"] * cost_nodes),
+        "prior": prior,
+        "type_prior": likelihood.T @ prior,
+        "likelihood": likelihood,
+        "posterior": posterior,
+        "cost_level": np.repeat(np.arange(settings["cost_levels"]), n_states)
+    }
+
+# Payoff tables (state, cost level, player, strategy, rivals shrinking): every
+# firm's payoff with its cost at the level under the state's awareness
+def bayesian_payoff_tables(inputs, types, model=PAYOFF_MODEL):
+    batch = (len(types["awareness"]), len(types["cost_scale"]))
+    batched = {
+        "companies": inputs["companies"],
+        "awareness": np.broadcast_to(types["awareness"][:, np.newaxis], batch),
+        "confidence": np.full(batch, inputs["confidence"]),
+        "cost": inputs["cost"] * types["cost_scale"][np.newaxis, :, np.newaxis] * np.ones(batch + (1,)),
+    }
+    for name in ["price", "market_share", "loyalty"]:
+        batched[name] = np.broadcast_to(inputs[name], batch + inputs[name].shape)
+    return payoff_table_from_inputs(batched, model)
+
+# Interim expected payoffs of every type against batches of type-contingent
+# profiles shrink (B, N, T), shaped (B, N, T, strategy). Each rival's
+# shrinking chance given the state gives the rivals' shrink count
+# distribution per state; the types' beliefs over states are folded into the
+# tables first, so the expectation over states and counts is one matmul.
+def bayesian_expected_payoffs(tables, types, shrink):
+    n_states, _, n_players, _, n_counts = tables.shape
+    n_types = len(types["cost_level"])
+    chance = np.einsum("bjt,wt->bwj", shrink, types["likelihood"])
+    dist = np.moveaxis(rival_shrink_distribution(chance), 1, 2).reshape(len(shrink), n_players, 1, n_states * n_counts)
+    
+    # weights[i, (w, k), (t, s)] = P(w | t) * tables[w, cost level of t, i, s, k]
+    weights = np.einsum("tw,wtisk->iwkts", types["posterior"], tables[:, types["cost_level"]])
+    weights = weights.reshape(n_players, n_states * n_counts, n_types * 2)
+    return (dist @ weights).reshape(len(shrink), n_players, n_types, 2)
+
+# Iterated elimination of strictly dominated actions per type. Given the
+# state, each rival surely shrinks (or maintains) when all of its types do,
+# which bounds the rival shrink count; an action goes when the type's worst
+# expected gain over those windows is still positive (or best one negative).
+# Returns the decided actions (N x T, -1 while undecided).
+def eliminate_dominated_types(tables, types):
+    n_states, _, n_players = tables.shape[:3]
+    n_types = len(types["cost_level"])
+    gains = tables[..., 1, :] - tables[..., 0, :]
+    decided = np.full((n_players, n_types), -1)
+    possible = types["likelihood"] > 0
+    rival_counts = np.arange(n_players)
+    
+    while True:
+        surely_shrinks = np.array([[np.all(decided[j][possible[w]] == 1) for j in range(n_players)] for w in range(n_states)])
+        surely_maintains = np.array([[np.all(decided[j][possible[w]] == 0) for j in range(n_players)] for w in range(n_states)])
+        forced = surely_shrinks.sum(axis=1, keepdims=True) - surely_shrinks
+        open_rivals = ~(surely_shrinks | surely_maintains)
+        free = open_rivals.sum(axis=1, keepdims=True) - open_rivals
+        feasible = (rival_counts >= forced[..., np.newaxis]) & (rival_counts <= (forced + free)[..., np.newaxis])
         
-        # Normalize to a 0-10 scale for the game
-        normalized_profit = min(10, max(0, total_profit / 1000000))
+        # Worst and best gain per (state, cost level, player) over the window
+        window = feasible[:, np.newaxis]
+        worst = np.where(window, gains, np.inf).min(axis=-1)[:, types["cost_level"]]
+        best = np.where(window, gains, -np.inf).max(axis=-1)[:, types["cost_level"]]
+        worst = np.einsum("tw,wti->it", types["posterior"], worst)
+        best = np.einsum("tw,wti->it", types["posterior"], best)
         
-        return round(normalized_profit, 2)
+        undecided = decided < 0
+        shrink = undecided & (worst > 0)
+        maintain = undecided & (best < 0)
+        if not (shrink.any() or maintain.any()):
+            return decided
+        decided[shrink] = 1
+        decided[maintain] = 0
+
+# Pure Bayes-Nash equilibria: type-contingent profiles where no type gains
+# by switching. After pruning, the undecided actions of all firms but the
+# one with the most undecided types are enumerated in chunks; that firm's
+# best reply is computed directly, since its own actions do not change its
+# expected payoffs, and then every type is checked.
+def solve_bayesian_game(tables, types, time_budget=BAYESIAN_SEARCH_TIME_BUDGET,
+                        chunk_size=BAYESIAN_CHUNK_SIZE, max_equilibria=MAX_BAYESIAN_EQUILIBRIA):
+    started = time.monotonic()
+    deadline = started + time_budget
+    decided = eliminate_dominated_types(tables, types)
+    n_players, n_types = decided.shape
     
-    # Calculate all payoffs
-    payoffs = {}
-    strategies = ["maintain", "shrink"]
+    undecided = decided < 0
+    responder = int(np.argmax(undecided.sum(axis=1)))
+    searched = undecided.copy()
+    searched[responder] = False
+    cells = np.argwhere(searched)
+    profiles = 1 << len(cells)
+    if profiles > BAYESIAN_MAX_PROFILES:
+        raise ValueError("Bayesian game is too large to search")
     
-    for mb_strategy in strategies:
-        if mb_strategy not in payoffs:
-            payoffs[mb_strategy] = {}
-            
-        for gd_strategy in strategies:
-            if gd_strategy not in payoffs[mb_strategy]:
-                payoffs[mb_strategy][gd_strategy] = {}
-                
-            for pg_strategy in strategies:
-                if pg_strategy not in payoffs[mb_strategy][gd_strategy]:
-                    payoffs[mb_strategy][gd_strategy][pg_strategy] = {}
-                
-                # Calculate Milk Bikis payoff
-                mb_payoff = calculate_payoff(
-                    milk_bikis_data, mb_strategy,
-                    good_day_data, gd_strategy,
-                    parle_g_data, pg_strategy,
-                    market, consumer
-                )
-                
-                # Calculate Good Day payoff
-                gd_payoff = calculate_payoff(
-                    good_day_data, gd_strategy,
-                    milk_bikis_data, mb_strategy,
-                    parle_g_data, pg_strategy,
-                    market, consumer
-                )
-                
-                # Calculate Parle G payoff
-                pg_payoff = calculate_payoff(
-                    parle_g_data, pg_strategy,
-                    milk_bikis_data, mb_strategy,
-                    good_day_data, gd_strategy,
-                    market, consumer
-                )
-                
-                payoffs[mb_strategy][gd_strategy][pg_strategy] = {
-                    "Milk Bikis": mb_payoff,
-                    "Good Day": gd_payoff,
-                    "Parle G": pg_payoff
-                }
+    base = np.where(undecided, 0, decided).astype(float)
+    equilibria = []
+    scanned = 0
+    complete = True
+    for start in range(0, profiles, chunk_size):
+        if time.monotonic() > deadline or len(equilibria) >= max_equilibria:
+            complete = False
+            break
+        index = np.arange(start, min(start + chunk_size, profiles))
+        shrink = np.repeat(base[np.newaxis], len(index), axis=0)
+        shrink[:, cells[:, 0], cells[:, 1]] = (index[:, np.newaxis] >> np.arange(len(cells))) & 1
+        
+        expected = bayesian_expected_payoffs(tables, types, shrink)
+        gains = expected[:, responder, :, 1] - expected[:, responder, :, 0]
+        shrink[:, responder] = np.where(undecided[responder], gains > 0, shrink[:, responder])
+        # Indifferent types may play either action; add the other replies
+        tied = undecided[responder] & (np.abs(gains) <= 1e-9)
+        variants = []
+        for row in np.flatnonzero(tied.any(axis=1)):
+            tied_types = np.flatnonzero(tied[row])
+            for bits in range(1, 1 << len(tied_types)):
+                variant = shrink[row].copy()
+                variant[responder, tied_types] = (bits >> np.arange(len(tied_types))) & 1
+                variants.append(variant)
+        if variants:
+            shrink = np.concatenate([shrink, np.array(variants)])
+        
+        expected = bayesian_expected_payoffs(tables, types, shrink)
+        gains = expected[..., 1] - expected[..., 0]
+        stable = np.all(np.where(shrink > 0, gains >= -1e-9, gains <= 1e-9), axis=(1, 2))
+        for row in np.flatnonzero(stable)[:max_equilibria - len(equilibria)]:
+            equilibria.append((shrink[row].astype(int), np.take_along_axis(expected[row], shrink[row].astype(int)[..., np.newaxis], axis=-1)[..., 0]))
+        scanned += len(index)
     
-    # Find Nash equilibria using best response analysis
-    nash_equilibria = []
-    
-    for mb_strategy in strategies:
-        for gd_strategy in strategies:
-            for pg_strategy in strategies:
-                # Check if this is a Nash equilibrium
-                mb_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Milk Bikis"]
-                gd_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Good Day"]
-                pg_payoff = payoffs[mb_strategy][gd_strategy][pg_strategy]["Parle G"]
-                
-                # Check if Milk Bikis can improve by changing strategy
-                mb_can_improve = False
-                other_strategy = "maintain" if mb_strategy == "shrink" else "shrink"
-                if payoffs[other_strategy][gd_strategy][pg_strategy]["Milk Bikis"] > mb_payoff:
-                    mb_can_improve = True
-                
-                # Check if Good Day can improve by changing strategy
-                gd_can_improve = False
-                other_strategy = "maintain" if gd_strategy == "shrink" else "shrink"
-                if payoffs[mb_strategy][other_strategy][pg_strategy]["Good Day"] > gd_payoff:
-                    gd_can_improve = True
-                
-                # Check if Parle G can improve by changing strategy
-                pg_can_improve = False
-                other_strategy = "maintain" if pg_strategy == "shrink" else "shrink"
-                if payoffs[mb_strategy][gd_strategy][other_strategy]["Parle G"] > pg_payoff:
-                    pg_can_improve = True
-                
-                # If no player can improve by changing strategy, this is a Nash equilibrium
-                if not (mb_can_improve or gd_can_improve or pg_can_improve):
-                    nash_equilibria.append(f"Milk Bikis: {mb_strategy.capitalize()}, Good Day: {gd_strategy.capitalize()}, Parle G: {pg_strategy.capitalize()}")
-    
-    # Determine recommendations based on Nash equilibria and payoffs
-    recommendations = {}
-    
-    # Extract strategies from the first Nash equilibrium
-    if nash_equilibria:
-        eq_parts = nash_equilibria[0].split(", ")
-        recommendations["Milk Bikis"] = eq_parts[0].split(": ")[1].lower()
-        recommendations["Good Day"] = eq_parts[1].split(": ")[1].lower()
-        recommendations["Parle G"] = eq_parts[2].split(": ")[1].lower()
-    else:
-        # Default recommendations based on payoff analysis
-        recommendations["Milk Bikis"] = "maintain"
-        recommendations["Good Day"] = "maintain"
-        recommendations["Parle G"] = "maintain"
+    return {
+        "decided": decided,
+        "equilibria": equilibria,
+        "type_profiles": 1 << int(n_players * n_types),
+        "undecided": int(undecided.sum()),
+        "profiles": profiles,
+        "profiles_scanned": scanned,
+        "complete": complete,
+        "elapsed": round(time.monotonic() - started, 4)
+    }
+
+def bayesian_type_labels(inputs, types):
+    n_states = len(types["awareness"])
+    return [
+        [
+            f"cost {inputs['cost'][i] * types['cost_scale'][t // n_states]:.2f}, awareness signal {types['awareness'][t % n_states] * 100:.0f}%"
+            for t in range(len(types["cost_level"]))
+        ]
+        for i in range(len(inputs["companies"]))
+    ]
+
+# Discount factors d in [0, 1) meeting every constraint a + b * d >= 0 (last
+# axis), as the interval [low, high]. low is inf when there are none.
+def discount_factor_interval(a, b):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bound = -a / b
+    low = np.maximum(0.0, np.where(b > 0, bound, -np.inf).max(axis=-1))
+    high = np.minimum(1.0, np.where(b < 0, bound, np.inf).min(axis=-1))
+    never = np.any((b == 0) & (a < 0), axis=-1) | (low > high) | (low >= 1)
+    return np.where(never, np.inf, low), np.where(never, np.inf, high)
+
+# Discount factors that sustain "everyone maintains" in the repeated game,
+# for batches of tables (..., N, 2, N). A firm cooperating earns C and
+# deviating by shrinking alone earns D once. Grim trigger then plays the
+# stage game's recommended equilibrium forever (P). Under tit for tat the
+# rivals copy the deviation for a period, so the deviator either returns and
+# takes the sucker payoff S once or keeps shrinking against shrinking rivals
+# (M). Each deviation is a linear constraint in the discount factor; with a
+# lone maintain bonus (S > C) or a punishment the firm prefers (P > C)
+# patience can also break collusion, so the result is an interval per firm.
+def collusion_discount_factors(payoff_tables):
+    n_players = payoff_tables.shape[-3]
+    cooperate = payoff_tables[..., 0, 0]
+    deviate = payoff_tables[..., 1, 0]
+    sucker = payoff_tables[..., 0, n_players - 1]
+    mutual_shrink = payoff_tables[..., 1, n_players - 1]
+    _, _, punish = recommended_profiles(payoff_tables.reshape((-1,) + payoff_tables.shape[-3:]))
+    punish = punish.reshape(cooperate.shape)
     
-    # Return simulation results
+    gain = cooperate - deviate
+    grim = discount_factor_interval(gain[..., np.newaxis], (deviate - punish)[..., np.newaxis])
+    tit_for_tat = discount_factor_interval(
+        np.stack([gain, gain], axis=-1),
+        np.stack([cooperate - sucker, deviate - mutual_shrink], axis=-1)
+    )
     return {
-        "nash_equilibrium": nash_equilibria,
-        "recommendations": recommendations,
-        "payoffs": payoffs
+        "cooperate": cooperate,
+        "deviate": deviate,
+        "punish": punish,
+        "grim_trigger": grim,
+        "tit_for_tat": tit_for_tat
     }
 
+def discount_factor_value(value):
+    return round(float(value), 4) if np.isfinite(value) else None
+
+# Critical discount factors of a batch of years with the same companies, for
+# the baseline inputs and for Monte Carlo draws, all solved as one
+# (years x (1 + samples)) batch of tables. Each year draws from its own
+# seed sequence, so its results do not depend on the other years asked for.
+def collusion_analysis(year_inputs, samples, seed, distributions=MONTE_CARLO_DISTRIBUTIONS,
+                       discount_factor=COLLUSION_DISCOUNT_FACTOR, model=PAYOFF_MODEL):
+    batches = []
+    for year, inputs in year_inputs:
+        draws = draw_monte_carlo_inputs(inputs, distributions, samples, np.random.default_rng([seed, year]))
+        batches.append({
+            name: np.concatenate([np.asarray(inputs[name], dtype=float).reshape((1,) + np.shape(draws[name])[1:]), draws[name]])
+            for name in draws if name != "companies"
+        })
+    batch = {name: np.stack([b[name] for b in batches]) for name in batches[0]}
+    batch["companies"] = year_inputs[0][1]["companies"]
+    result = collusion_discount_factors(payoff_table_from_inputs(batch, model))
+    
+    summaries = []
+    for y, (year, inputs) in enumerate(year_inputs):
+        companies = inputs["companies"]
+        summary = {"year": year, "companies": companies, "samples": samples, "seed": seed, "discount_factor": discount_factor}
+        for strategy in ["grim_trigger", "tit_for_tat"]:
+            low, high = result[strategy]
+            # Collusion holds when every firm's interval contains the discount factor
+            market_low = low[y].max(axis=-1)
+            market_high = np.where(np.isfinite(market_low), high[y].min(axis=-1), np.inf)
+            market_low = np.where(market_low <= market_high, market_low, np.inf)
+            summary[strategy] = {
+                "critical": {company: discount_factor_value(low[y, 0, i]) for i, company in enumerate(companies)},
+                # Upper limits below 1, where patience makes deviating pay
+                "maximum": {company: discount_factor_value(high[y, 0, i]) if high[y, 0, i] < 1 else None for i, company in enumerate(companies)},
+                "market_critical": discount_factor_value(market_low[0]),
+                "sustainable": bool(market_low[0] <= discount_factor <= market_high[0]),
+                "quantiles": {
+                    company: dict(zip(
+                        [f"{round(q * 100)}%" for q in COLLUSION_QUANTILES],
+                        [discount_factor_value(v) for v in np.quantile(low[y, 1:, i], COLLUSION_QUANTILES, method="inverted_cdf")]
+                    ))
+                    for i, company in enumerate(companies)
+                },
+                "sustainable_share": float(((market_low[1:] <= discount_factor) & (discount_factor <= market_high[1:])).mean())
+            }
+        summary["payoffs"] = {
+            company: {
+                "cooperate": float(result["cooperate"][y, 0, i]),
+                "deviate": float(result["deviate"][y, 0, i]),
+                "punish": float(result["punish"][y, 0, i])
+            }
+            for i, company in enumerate(companies)
+        }
+        summaries.append(summary)
+    return summaries
+
+# Bar colors: the dashboard's brand colors first, then a seaborn palette
+def chart_colors(n):
+    colors = ["#dc3545", "#fd7e14", "#198754"]
+    if n > len(colors):
+        colors += sns.color_palette("husl", n - len(colors)).as_hex()
+    return colors[:n]
+
 @app.route('/api/generate-chart/<chart_type>/<int:year>')
 def generate_chart(chart_type, year):
     # Get analysis data
@@ -1020,34 +4031,43 @@ def generate_chart(chart_type, year):
     fig = Figure(figsize=(10, 6))
     ax = fig.subplots()
     
+    companies = analysis.get("companies") or list(analysis["company_data"].keys())
+    
     if chart_type == "payoff_heatmap":
         # Create payoff heatmap
-        payoffs = analysis.get("full_payoffs", {})
+        payoffs = analysis.get("full_payoffs") or {}
+        first_company, second_company = companies[0], companies[1]
         
-        # Extract payoffs for Milk Bikis when Parle G maintains
-        mb_gd_payoffs = np.zeros((2, 2))
+        # Extract payoffs for the first company when all other companies maintain
+        first_payoffs = np.zeros((2, 2))
         
-        strategies = ["maintain", "shrink"]
-        for i, mb_strategy in enumerate(strategies):
-            for j, gd_strategy in enumerate(strategies):
-                mb_gd_payoffs[i, j] = payoffs.get(mb_strategy, {}).get(gd_strategy, {}).get("maintain", {}).get("Milk Bikis", 0)
+        for i, first_strategy in enumerate(STRATEGIES):
+            for j, second_strategy in enumerate(STRATEGIES):
+                node = payoffs.get(first_strategy, {}).get(second_strategy, {})
+                for _ in companies[2:]:
+                    node = node.get("maintain", {})
+                first_payoffs[i, j] = node.get(first_company, 0)
         
-        sns.heatmap(mb_gd_payoffs, annot=True, fmt=".2f", cmap="YlGnBu", 
-                    xticklabels=strategies, yticklabels=strategies, ax=ax)
+        sns.heatmap(first_payoffs, annot=True, fmt=".2f", cmap="YlGnBu", 
+                    xticklabels=STRATEGIES, yticklabels=STRATEGIES, ax=ax)
         
-        ax.set_title("Milk Bikis Payoffs (when Parle G maintains)")
-        ax.set_xlabel("Good Day Strategy")
-        ax.set_ylabel("Milk Bikis Strategy")
+        if len(companies) == 3:
+            ax.set_title(f"{first_company} Payoffs (when {companies[2]} maintains)")
+        elif len(companies) > 3:
+            ax.set_title(f"{first_company} Payoffs (when other companies maintain)")
+        else:
+            ax.set_title(f"{first_company} Payoffs")
+        ax.set_xlabel(f"{second_company} Strategy")
+        ax.set_ylabel(f"{first_company} Strategy")
     
     elif chart_type == "market_share":
         # Create market share comparison
-        companies = ["Milk Bikis", "Good Day", "Parle G"]
         market_shares = [analysis["company_data"][company]["marketShare"] for company in companies]
         
-        ax.bar(companies, market_shares, color=["#dc3545", "#fd7e14", "#198754"])
+        ax.bar(companies, market_shares, color=chart_colors(len(companies)))
         ax.set_title("Market Share Comparison")
         ax.set_ylabel("Market Share (%)")
-        ax.set_ylim(0, 50)
+        ax.set_ylim(0, max(50, max(market_shares) + 5))
         
         # Add value labels
         for i, v in enumerate(market_shares):
@@ -1055,10 +4075,9 @@ def generate_chart(chart_type, year):
     
     elif chart_type == "price_size_ratio":
         # Create price/size ratio comparison
-        companies = ["Milk Bikis", "Good Day", "Parle G"]
         ratios = [analysis["company_data"][company]["pricePerUnit"] for company in companies]
         
-        ax.bar(companies, ratios, color=["#dc3545", "#fd7e14", "#198754"])
+        ax.bar(companies, ratios, color=chart_colors(len(companies)))
         ax.set_title("Price per 100ml/g Comparison")
         ax.set_ylabel("Price (₹)")
         
@@ -1079,14 +4098,11 @@ def generate_chart(chart_type, year):
 
 @app.route('/api/export-data/<int:year>')
 def export_data(year):
-    # Get analysis data
-    analysis = analysis_collection.find_one({"year": year})
-    if not analysis:
+    # Get analysis data as JSON
+    analysis_json = load_serialized_analysis(year)
+    if analysis_json is None:
         return jsonify({"error": "No analysis data available"}), 404
     
-    # Convert MongoDB document to JSON
-    analysis_json = json_util.dumps(analysis)
-    
     # Return as downloadable file
     return analysis_json, 200, {
         'Content-Type': 'application/json',
@@ -110,6 +110,9 @@ document.addEventListener("DOMContentLoaded", () => {
       loadPayoffHeatmap(year)
       loadMarketShareChart(year)
       loadPriceRatioChart(year)
+      loadSensitivity(year)
+      loadQuantalResponse(year)
+      loadCollusion(year)
     } catch (error) {
       console.error("Error loading analysis data:", error)
       alert("Failed to load analysis data. Please check the console for details.")
@@ -160,6 +163,9 @@ document.addEventListener("DOMContentLoaded", () => {
     // Update Nash equilibrium
     updateNashEquilibrium(data.nash_equilibrium)
 
+    // Update correlated equilibrium
+    updateCorrelatedEquilibrium(data.correlated_equilibrium)
+
     // Update strategy recommendations
     updateStrategyRecommendations(data.company_data)
 
@@ -186,6 +192,22 @@ document.addEventListener("DOMContentLoaded", () => {
     })
   }
 
+  // Show the welfare-maximizing correlated equilibrium below the Nash equilibria
+  function updateCorrelatedEquilibrium(correlated) {
+    if (!correlated || !correlated.welfare) {
+      return
+    }
+
+    const container = document.getElementById("nashEquilibrium")
+    const item = document.createElement("div")
+    item.className = "nash-equilibrium-item"
+    const profiles = correlated.welfare.distribution
+      .map((entry) => `${entry.profile} (${(entry.probability * 100).toFixed(1)}%)`)
+      .join("; ")
+    item.textContent = `Welfare-maximizing correlated equilibrium: ${profiles}`
+    container.appendChild(item)
+  }
+
   // Update strategy recommendations
   function updateStrategyRecommendations(companyData) {
     const container = document.getElementById("strategyRecommendations")
@@ -349,6 +371,144 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  // Load sensitivity analysis: total Sobol indices of each company's payoff
+  // and strategy for the most influential factors
+  async function loadSensitivity(year) {
+    const container = document.getElementById("sensitivityAnalysis")
+    container.innerHTML = "<p class='text-muted'>Computing sensitivity analysis...</p>"
+
+    try {
+      const response = await fetch(`/api/sensitivity/${year}`)
+      if (!response.ok) {
+        throw new Error("Failed to fetch sensitivity analysis")
+      }
+
+      const data = await response.json()
+      const influence = (factor) =>
+        Math.max(...data.companies.map((company) => data.sobol[company].payoff[factor].total || 0))
+      const factors = [...data.factors].sort((a, b) => influence(b) - influence(a)).slice(0, 6)
+      const format = (value) => (value === null ? "-" : value.toFixed(2))
+
+      container.innerHTML = `
+                <table class="table table-sm">
+                    <thead>
+                        <tr>
+                            <th>Factor</th>
+                            ${data.companies.map((company) => `<th>${company} payoff / strategy</th>`).join("")}
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${factors
+                          .map(
+                            (factor) => `
+                        <tr>
+                            <td>${factor}</td>
+                            ${data.companies
+                              .map(
+                                (company) =>
+                                  `<td>${format(data.sobol[company].payoff[factor].total)} / ${format(data.sobol[company].shrink[factor].total)}</td>`,
+                              )
+                              .join("")}
+                        </tr>`,
+                          )
+                          .join("")}
+                    </tbody>
+                </table>
+                <p class="text-muted small">Total Sobol indices: the share of variance in each company's payoff and recommended strategy due to the factor.</p>
+            `
+    } catch (error) {
+      console.error("Error loading sensitivity analysis:", error)
+      container.innerHTML = "<p class='text-danger'>Failed to load sensitivity analysis</p>"
+    }
+  }
+
+  // Load the logit QRE of the year: shrink probabilities as rationality grows
+  async function loadQuantalResponse(year) {
+    const container = document.getElementById("quantalResponse")
+    container.innerHTML = "<p class='text-muted'>Tracing quantal response equilibrium...</p>"
+
+    try {
+      const response = await fetch(`/api/qre?years=${year}`)
+      if (!response.ok) {
+        throw new Error("Failed to fetch quantal response equilibrium")
+      }
+
+      const data = (await response.json())[0]
+      const percent = (value) => `${(value * 100).toFixed(1)}%`
+
+      container.innerHTML = `
+                <table class="table table-sm">
+                    <thead>
+                        <tr>
+                            <th>Rationality (&lambda;)</th>
+                            ${data.companies.map((company) => `<th>${company} shrinks</th>`).join("")}
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${data.at
+                          .map(
+                            (point) => `
+                        <tr>
+                            <td>${point.lambda}</td>
+                            ${data.companies.map((company) => `<td>${percent(point.shrink[company])}</td>`).join("")}
+                        </tr>`,
+                          )
+                          .join("")}
+                    </tbody>
+                </table>
+                <p class="text-muted small">Limiting equilibrium: ${data.limit.profile}</p>
+            `
+    } catch (error) {
+      console.error("Error loading quantal response equilibrium:", error)
+      container.innerHTML = "<p class='text-danger'>Failed to load quantal response equilibrium</p>"
+    }
+  }
+
+  // Load whether "everyone maintains" can be sustained as tacit collusion
+  async function loadCollusion(year) {
+    const container = document.getElementById("collusionAnalysis")
+    container.innerHTML = "<p class='text-muted'>Computing collusion sustainability...</p>"
+
+    try {
+      const response = await fetch(`/api/collusion?years=${year}`)
+      if (!response.ok) {
+        throw new Error("Failed to fetch collusion analysis")
+      }
+
+      const data = (await response.json()).years[0]
+      const strategies = { grim_trigger: "Grim trigger", tit_for_tat: "Tit for tat" }
+      const factor = (value) => (value === null ? "never" : value.toFixed(2))
+
+      container.innerHTML = `
+                <table class="table table-sm">
+                    <thead>
+                        <tr>
+                            <th>Strategy</th>
+                            ${data.companies.map((company) => `<th>${company} minimum discount factor</th>`).join("")}
+                            <th>Sustainable at ${data.discount_factor}</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        ${Object.entries(strategies)
+                          .map(
+                            ([key, label]) => `
+                        <tr>
+                            <td>${label}</td>
+                            ${data.companies.map((company) => `<td>${factor(data[key].critical[company])}</td>`).join("")}
+                            <td>${data[key].sustainable ? "Yes" : "No"} (${(data[key].sustainable_share * 100).toFixed(1)}% of draws)</td>
+                        </tr>`,
+                          )
+                          .join("")}
+                    </tbody>
+                </table>
+                <p class="text-muted small">Lowest per-period discount factor at which each company prefers keeping sizes to shrinking alone.</p>
+            `
+    } catch (error) {
+      console.error("Error loading collusion analysis:", error)
+      container.innerHTML = "<p class='text-danger'>Failed to load collusion analysis</p>"
+    }
+  }
+
   // Update last updated timestamp
   function updateLastUpdated(timestamp) {
     const lastUpdatedElement = document.getElementById("lastUpdated")
@@ -661,12 +661,13 @@ document.addEventListener("DOMContentLoaded", () => {
         return
       }
 
-      // Fetch historical data for each chart type
-      const sizeData = await fetchHistoricalData("size")
-      const priceData = await fetchHistoricalData("price")
-      const ratioData = await fetchHistoricalData("ratio")
-      const marketShareData = await fetchHistoricalData("market_share")
-      const profitMarginData = await fetchHistoricalData("profit_margin")
+      // Fetch historical data for all chart types in one request
+      const historicalData = await fetchAllHistoricalData()
+      const sizeData = historicalData.size
+      const priceData = historicalData.price
+      const ratioData = historicalData.ratio
+      const marketShareData = historicalData.market_share
+      const profitMarginData = historicalData.profit_margin
 
       // Create charts
       createSizeChart(sizeData)
@@ -682,12 +683,13 @@ document.addEventListener("DOMContentLoaded", () => {
   // Update charts with new data
   async function updateCharts() {
     try {
-      // Fetch historical data for each chart type
-      const sizeData = await fetchHistoricalData("size")
-      const priceData = await fetchHistoricalData("price")
-      const ratioData = await fetchHistoricalData("ratio")
-      const marketShareData = await fetchHistoricalData("market_share")
-      const profitMarginData = await fetchHistoricalData("profit_margin")
+      // Fetch historical data for all chart types in one request
+      const historicalData = await fetchAllHistoricalData()
+      const sizeData = historicalData.size
+      const priceData = historicalData.price
+      const ratioData = historicalData.ratio
+      const marketShareData = historicalData.market_share
+      const profitMarginData = historicalData.profit_margin
 
       // Update charts
       updateSizeChart(sizeData)
@@ -700,6 +702,25 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
+  // Fetch every historical series at once, falling back to per-type requests
+  async function fetchAllHistoricalData() {
+    const dataTypes = ["size", "price", "ratio", "market_share", "profit_margin"]
+    try {
+      const response = await fetch(`/api/historical-data?types=${dataTypes.join(",")}`)
+      if (!response.ok) {
+        throw new Error("Failed to fetch historical data")
+      }
+      return await response.json()
+    } catch (error) {
+      console.error("Error fetching historical data:", error)
+      const historicalData = {}
+      for (const dataType of dataTypes) {
+        historicalData[dataType] = await fetchHistoricalData(dataType)
+      }
+      return historicalData
+    }
+  }
+
   // Fetch historical data
   async function fetchHistoricalData(dataType) {
     try {